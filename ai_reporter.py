@@ -1,16 +1,88 @@
-import google.generativeai as genai
+import concurrent.futures
+import hashlib
+import json
 import os
+import threading
+import time
+from http_cache import CACHE_DIR, atomic_write
+
+REPORT_CACHE_FILE = os.path.join(CACHE_DIR, "ai_reports.json")
+# Campos del día que entran al prompt (y a la clave de caché)
+REPORT_FIELDS = ['date_str', 'sky_desc', 'max_temp', 'min_temp', 'wind_speed', 'wind_dir', 'gusts']
+
 class MeteorologistBot:
-    def __init__(self):
-        self.api_key = os.environ.get("GOOGLE_API_KEY") 
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
+    # Modelos ya construidos, compartidos entre instancias
+    _model_cache = {}
+    _configured_key = None
+    _lock = threading.Lock()
+
+    def __init__(self, budget=10.0, cache_file=REPORT_CACHE_FILE, max_entries=500):
+        self.api_key = os.environ.get("GOOGLE_API_KEY")
         self.models = ["gemini-1.5-flash", "gemini-1.5-flash-8b", "gemini-2.0-flash-exp"]
+        # Presupuesto de latencia (segundos) para toda la cadena de modelos
+        self.budget = budget
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+    def _model(self, model_name):
+        # google.generativeai (y grpc/protobuf) se carga recién acá: un reporte en caché no lo necesita
+        import google.generativeai as genai
+        with self._lock:
+            if MeteorologistBot._configured_key != self.api_key:
+                genai.configure(api_key=self.api_key)
+                MeteorologistBot._configured_key = self.api_key
+            if model_name not in self._model_cache:
+                self._model_cache[model_name] = genai.GenerativeModel(model_name)
+            return self._model_cache[model_name]
+    def _cache_key(self, days, model_name, mode):
+        payload = json.dumps([{k: d.get(k) for k in REPORT_FIELDS} for d in days], sort_keys=True, default=str)
+        return hashlib.sha256(f"{mode}|{model_name}|{payload}".encode()).hexdigest()
+    def _load_cache(self):
+        try:
+            with open(self.cache_file, 'r') as f: return json.load(f)
+        except (OSError, ValueError): return {}
+    def _cached(self, days, mode):
+        cache = self._load_cache()
+        for model_name in self.models:
+            hit = cache.get(self._cache_key(days, model_name, mode))
+            if hit: return hit['result']
+        return None
+    def _store(self, days, model_name, mode, result):
+        with self._lock:
+            cache = self._load_cache()
+            cache[self._cache_key(days, model_name, mode)] = {'result': result, 'ts': time.time()}
+            if len(cache) > self.max_entries:
+                for key, _ in sorted(cache.items(), key=lambda kv: kv[1]['ts'])[:len(cache) - self.max_entries]:
+                    del cache[key]
+            try:
+                os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+                atomic_write(self.cache_file, json.dumps(cache).encode())
+            except OSError as e: print(f"AI Cache Error: {e}")
+    def _call_with_budget(self, prompt, parse, generation_config=None):
+        # Recorre la cadena de modelos sin pasarse del presupuesto total; None si se agota
+        deadline = time.monotonic() + self.budget
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        try:
+            for model_name in self.models:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0: break
+                future = pool.submit(self._model(model_name).generate_content, prompt,
+                                     generation_config=generation_config, request_options={"timeout": remaining})
+                try:
+                    return model_name, parse(future.result(timeout=remaining).text)
+                except concurrent.futures.TimeoutError:
+                    print(f"AI Timeout ({model_name}): presupuesto agotado")
+                    break
+                except Exception as e:
+                    print(f"AI Error ({model_name}): {e}")
+                    continue
+            return None, None
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
     def generate_template_report(self, daily_data):
         sky = daily_data.get('sky_desc', 'Variable').lower()
-        temp_max = daily_data.get('max_temp', 0)
-        wind = daily_data.get('wind_speed', 0)
-        
+        temp_max = daily_data.get('max_temp') or 0
+        wind = daily_data.get('wind_speed') or 0
+
         condition = "tiempo agradable"
         if "lluvia" in sky or "llovizna" in sky: condition = "inestable"
         elif "tormenta" in sky: condition = "alerta por tormentas"
@@ -18,18 +90,13 @@ class MeteorologistBot:
         elif "despejado" in sky and temp_max > 25: condition = "caluroso"
         elif "despejado" in sky: condition = "buen tiempo"
         elif temp_max < 5: condition = "frío"
-        
+
         if wind > 40: condition += " y ventoso"
-        
+
         report = f"{daily_data['date_str']} – SMA: {condition} con {daily_data['sky_desc']}, máxima {daily_data['max_temp']}°C, mínima {daily_data['min_temp']}°C. Viento del {daily_data['wind_dir']} a {daily_data['wind_speed']} km/h (Ráfagas {daily_data['gusts']} km/h). #ClimaSMA"
         return report
-    def generate_report(self, daily_data):
-        # 1. Try API if Key exists
-        if self.api_key:
-            prompt = f"""
-            Actúa como un meteorólogo local experto de San Martín de los Andes.
-            Genera un reporte breve con "lógica de meteorólogo" para el siguiente día:
-            
+    def _day_prompt(self, daily_data):
+        return f"""
             Datos:
             Fecha: {daily_data['date_str']}
             Cielo: {daily_data['sky_desc']}
@@ -37,16 +104,42 @@ class MeteorologistBot:
             Temp Mín: {daily_data['min_temp']}°C
             Viento: {daily_data['wind_speed']} km/h (Dir: {daily_data['wind_dir']})
             Ráfagas: {daily_data['gusts']} km/h
-            
+
             Formato OBLIGATORIO:
             {daily_data['date_str']} – SMA: [condiciones] con [cielo detallado], máxima {daily_data['max_temp']}°C, mínima {daily_data['min_temp']}°C. Viento del {daily_data['wind_dir']} a {daily_data['wind_speed']} km/h (Ráfagas {daily_data['gusts']} km/h). #ClimaSMA
             """
-            for model_name in self.models:
-                try:
-                    model = genai.GenerativeModel(model_name)
-                    response = model.generate_content(prompt)
-                    return response.text.strip()
-                except Exception: continue
-        
+    def generate_report(self, daily_data):
+        # 1. Try API if Key exists (caché primero: el mismo pronóstico no se paga dos veces)
+        if self.api_key:
+            cached = self._cached([daily_data], 'day')
+            if cached: return cached
+            prompt = f"""
+            Actúa como un meteorólogo local experto de San Martín de los Andes.
+            Genera un reporte breve con "lógica de meteorólogo" para el siguiente día:
+            {self._day_prompt(daily_data)}"""
+            model_name, report = self._call_with_budget(prompt, lambda text: text.strip())
+            if report:
+                self._store([daily_data], model_name, 'day', report)
+                return report
+
         # 2. Fallback to Template (Offline Mode)
         return self.generate_template_report(daily_data) + " (Reporte Automático Offline)"
+    def generate_reports(self, days):
+        # Modo batch: los reportes de todos los días en un solo pedido estructurado (JSON)
+        if self.api_key and days:
+            cached = self._cached(days, 'batch')
+            if cached: return cached
+            prompt = "\n".join([
+                "Actúa como un meteorólogo local experto de San Martín de los Andes.",
+                f"Genera {len(days)} reportes breves con \"lógica de meteorólogo\", uno por cada día, en el mismo orden.",
+                "Responde SOLO con un arreglo JSON de strings, un string por día.",
+            ] + [self._day_prompt(d) for d in days])
+            def parse(text):
+                reports = json.loads(text)
+                if not isinstance(reports, list) or len(reports) != len(days): raise ValueError("respuesta batch incompleta")
+                return [str(r).strip() for r in reports]
+            model_name, reports = self._call_with_budget(prompt, parse, generation_config={"response_mime_type": "application/json"})
+            if reports:
+                self._store(days, model_name, 'batch', reports)
+                return reports
+        return [self.generate_template_report(d) + " (Reporte Automático Offline)" for d in days]
@@ -0,0 +1,261 @@
+import argparse
+import email.utils
+import hashlib
+import http.server
+import json
+import os
+import threading
+import urllib.parse
+import numpy as np
+from metrics import REGISTRY
+from records import json_default
+from refresher import ForecastRefresher, SNAPSHOT_FILE, load_snapshot
+
+# Los clientes pueden cachear un minuto; después revalidan con If-None-Match (ETag = snapshot_id)
+MAX_AGE = 60
+# Puntos por pedido a /forecast/points (todos salen del mismo cubo, sin pedidos upstream)
+MAX_POINTS = 500
+
+def _series(values):
+    # Array NumPy -> lista JSON con null donde no hay dato
+    return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+def forecast_payload(snapshot, debug=False):
+    days = snapshot.data if debug else [{k: v for k, v in day.items() if k != 'debug'} for day in snapshot.data]
+    return {'snapshot_id': snapshot.snapshot_id, 'created_at': snapshot.created_at, 'days': days}
+
+def hourly_payload(snapshot):
+    hourly = snapshot.hourly
+    if hourly is None: return None
+    variables = hourly['variables']
+    return {
+        'snapshot_id': snapshot.snapshot_id,
+        'created_at': snapshot.created_at,
+        'time': [str(t) for t in hourly['time'].astype('datetime64[m]')],
+        'fused': {var: _series(hourly['fused'][:, v]) for v, var in enumerate(variables)},
+        'sources': {name: {var: _series(hourly['values'][s, :, v]) for v, var in enumerate(variables)}
+                    for s, name in enumerate(hourly['sources'])},
+    }
+
+def parse_points_query(query):
+    # "lat=-40.2,-40.3&lon=-71.2,-71.25&elev=1250,1980&hourly=1" -> argumentos de points_payload
+    params = urllib.parse.parse_qs(query)
+    def floats(name):
+        raw = ",".join(params.get(name, []))
+        if not raw: return None
+        try: return [float(v) for v in raw.split(",")]
+        except ValueError: raise ValueError(f"{name}: se esperan números separados por comas")
+    lat, lon, elevation = floats('lat'), floats('lon'), floats('elev')
+    if (lat is None) != (lon is None): raise ValueError("lat y lon van juntos")
+    if lat is not None and len(lat) != len(lon): raise ValueError("lat y lon deben tener la misma cantidad de valores")
+    if elevation is not None and (lat is None or len(elevation) != len(lat)): raise ValueError("elev debe tener un valor por punto")
+    if lat is not None and len(lat) > MAX_POINTS: raise ValueError(f"máximo {MAX_POINTS} puntos por pedido")
+    return {'lat': lat, 'lon': lon, 'elevation': elevation, 'hourly': params.get('hourly', ['0'])[0] == '1'}
+
+def points_payload(snapshot, lat=None, lon=None, elevation=None, hourly=False):
+    # Interpolación del cubo espacial a puntos arbitrarios (sin lat/lon: los puntos de la grilla)
+    grid = snapshot.grid
+    if grid is None: return None
+    names = grid.names if lat is None else [None] * len(lat)
+    if lat is None: lat, lon, elevation = grid.lat, grid.lon, grid.elevation
+    values = grid.interpolate(lat, lon, elevation)
+    dates, daily = grid.daily(values)
+    points = []
+    for q in range(len(values)):
+        point = {
+            'name': names[q], 'lat': float(lat[q]), 'lon': float(lon[q]),
+            'elevation': None if elevation is None else float(elevation[q]),
+            'daily': [dict({'date': str(date)}, **{var: _series(block[q])[i] for var, block in daily.items()})
+                      for i, date in enumerate(dates)],
+        }
+        if hourly: point['hourly'] = {var: _series(values[q, :, v]) for v, var in enumerate(grid.variables)}
+        points.append(point)
+    payload = {'snapshot_id': snapshot.snapshot_id, 'created_at': snapshot.created_at, 'points': points}
+    if hourly: payload['time'] = [str(t) for t in grid.time.astype('datetime64[m]')]
+    return payload
+
+class SnapshotSource:
+    # Último snapshot: del refresher de este proceso o, sin refresher, del archivo en disco
+    # (otro proceso, p. ej. la app de Streamlit, es quien refresca)
+    def __init__(self, refresher=None, path=SNAPSHOT_FILE):
+        self.refresher = refresher
+        self.path = path
+        self._snapshot = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.refresher: return self.refresher.get(wait=30)
+        with self._lock:
+            try: mtime = os.stat(self.path).st_mtime_ns
+            except OSError: return self._snapshot
+            if mtime != self._mtime:
+                self._snapshot = load_snapshot(self.path) or self._snapshot
+                self._mtime = mtime
+            return self._snapshot
+
+    def status(self):
+        snapshot = self.get()
+        return {
+            'snapshot_id': snapshot.snapshot_id if snapshot else None,
+            'age_s': round(snapshot.age, 1) if snapshot else None,
+            'refreshing': bool(self.refresher and self.refresher.refreshing),
+            'last_error': self.refresher.last_error if self.refresher else None,
+        }
+
+class ForecastAPI:
+    # Endpoint JSON de solo lectura: cada representación se serializa una vez por snapshot
+    # y los consumidores que ya la tienen reciben 304 sin cuerpo
+    ROUTES = {
+        '/forecast': lambda snapshot: forecast_payload(snapshot),
+        '/forecast/debug': lambda snapshot: forecast_payload(snapshot, debug=True),
+        '/forecast/hourly': hourly_payload,
+    }
+
+    def __init__(self, source, host="127.0.0.1", port=8000):
+        self.source = source
+        self._bodies = {}
+        self._lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def render(self, route, snapshot):
+        key = (route, snapshot.snapshot_id)
+        with self._lock:
+            body = self._bodies.get(key)
+        if body is not None: return body
+        payload = self.ROUTES[route](snapshot)
+        body = json.dumps(payload, default=json_default, ensure_ascii=False).encode() if payload is not None else None
+        with self._lock:
+            # Solo se conservan las representaciones del snapshot vigente
+            self._bodies = {k: v for k, v in self._bodies.items() if k[1] == snapshot.snapshot_id}
+            self._bodies[key] = body
+        return body
+
+    def _handler(self):
+        api = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status, body=b"", ctype="application/json", headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items(): self.send_header(name, value)
+                if status != 304:
+                    self.send_header("Content-Type", ctype + "; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD": self.wfile.write(body)
+
+            def _json(self, status, payload, headers=None):
+                self._send(status, json.dumps(payload, default=json_default).encode(), headers=headers)
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0].rstrip("/") or "/"
+                if path == "/healthz":
+                    status = api.source.status()
+                    self._json(200 if status['snapshot_id'] else 503, status)
+                    return
+                if path == "/metrics":
+                    self._send(200, REGISTRY.to_prometheus().encode(), ctype="text/plain; version=0.0.4")
+                    return
+                if path not in api.ROUTES and path != "/forecast/points":
+                    self._json(404, {'error': f"ruta desconocida: {path}", 'routes': sorted(api.ROUTES) + ["/forecast/points", "/healthz", "/metrics"]})
+                    return
+                query = self.path.split("?", 1)[1] if "?" in self.path else ""
+                if path == "/forecast/points":
+                    try: points = parse_points_query(query)
+                    except ValueError as e:
+                        self._json(400, {'error': str(e)})
+                        return
+                snapshot = api.source.get()
+                if snapshot is None:
+                    self._json(503, {'error': "todavía no hay un pronóstico calculado"}, headers={"Retry-After": "30"})
+                    return
+                suffix = path.rsplit("/", 1)[-1] if path != "/forecast" else ""
+                # Cada consulta de puntos es una representación distinta del mismo snapshot
+                if path == "/forecast/points": suffix += "-" + hashlib.sha1(query.encode()).hexdigest()[:10]
+                etag = f'"{snapshot.snapshot_id}{"-" + suffix if suffix else ""}"'
+                headers = {
+                    "ETag": etag,
+                    "Cache-Control": f"public, max-age={MAX_AGE}",
+                    "Last-Modified": email.utils.formatdate(snapshot.created_at, usegmt=True),
+                }
+                if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+                    self._send(304, headers=headers)
+                    return
+                if path == "/forecast/points":
+                    payload = points_payload(snapshot, **points)
+                    body = json.dumps(payload, default=json_default, ensure_ascii=False).encode() if payload else None
+                else:
+                    body = api.render(path, snapshot)
+                if body is None:
+                    self._json(404, {'error': "el snapshot no tiene grilla " + ("espacial" if path == "/forecast/points" else "horaria")})
+                    return
+                self._send(200, body, headers=headers)
+
+            do_HEAD = do_GET
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+def print_forecast(snapshot):
+    print(f"Pronóstico {snapshot.snapshot_id} (hace {int(snapshot.age // 60)} min)")
+    for day in snapshot.data:
+        print(f"  {day['date_str']:<13} {day['max_temp']!s:>3}° / {day['min_temp']!s:>3}°  "
+              f"viento {day['wind_speed']!s:>3} km/h {day['wind_dir']:<3} ráfagas {day['gusts']!s:>3} km/h  {day['sky_desc']}")
+    print(f"  {snapshot.data[0]['source']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="API JSON y CLI del pronóstico fusionado")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="servir el último snapshot por HTTP")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--interval", type=int, default=3600, help="segundos entre refrescos")
+    serve.add_argument("--no-refresh", action="store_true", help="solo leer el snapshot en disco (otro proceso refresca)")
+    show = sub.add_parser("show", help="imprimir el último snapshot")
+    show.add_argument("--json", action="store_true")
+    show.add_argument("--debug", action="store_true", help="incluir los valores crudos por fuente")
+    show.add_argument("--max-age", type=int, default=3600, help="refrescar si el snapshot en disco es más viejo (segundos)")
+    sub.add_parser("refresh", help="recalcular la fusión y guardar el snapshot")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        refresher = None if args.no_refresh else ForecastRefresher(interval=args.interval).start()
+        api = ForecastAPI(SnapshotSource(refresher), args.host, args.port)
+        print(f"Sirviendo pronóstico en {api.base_url}/forecast")
+        try: api.serve_forever()
+        except KeyboardInterrupt: api.shutdown()
+        return
+
+    refresher = ForecastRefresher()
+    snapshot = refresher.get()
+    if args.command == "refresh" or snapshot is None or (args.command == "show" and snapshot.age > args.max_age):
+        if not refresher.refresh_now():
+            print(f"Error: {refresher.last_error}")
+            if snapshot is None or args.command == "refresh": raise SystemExit(1)
+        snapshot = refresher.get()
+    if args.command == "refresh":
+        print(f"Snapshot {snapshot.snapshot_id} guardado en {refresher.snapshot_file}")
+    elif args.json:
+        print(json.dumps(forecast_payload(snapshot, debug=args.debug), default=json_default, ensure_ascii=False, indent=2))
+    else:
+        print_forecast(snapshot)
+
+if __name__ == "__main__":
+    main()
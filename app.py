@@ -1,9 +1,12 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
 import datetime
-from fusion_engine import FusionEngine
-from ai_reporter import MeteorologistBot
+from refresher import ForecastRefresher
+from metrics import REGISTRY
+from records import json_default
 import os
+import html
+import json
 import textwrap
 # Page Config
 st.set_page_config(page_title="Pronóstico SMA - Fusión", page_icon="🌦️", layout="wide")
@@ -99,6 +102,26 @@ st.markdown("""
         text-align: right;
         font-style: italic;
     }
+    .audit-grid {
+        display: grid;
+        gap: 10px;
+        margin-bottom: 10px;
+    }
+    .audit-grid pre {
+        font-size: 0.75em;
+        background: rgba(128,128,128,0.08);
+        padding: 8px;
+        border-radius: 6px;
+        max-height: 320px;
+        overflow: auto;
+        white-space: pre-wrap;
+    }
+    .ensemble-tag {
+        margin-top: 8px;
+        font-size: 0.75em;
+        color: var(--text-color);
+        opacity: 0.8;
+    }
     .ai-report-box {
         background-color: var(--secondary-background-color);
         border-left: 5px solid #2196f3;
@@ -111,6 +134,135 @@ st.markdown("""
 # Title
 st.title("🌦️ Weather Aggregator SMA")
 st.markdown("**Fusión de Fuentes:** SMN (Nacional) + AIC (Cuenca) + Open-Meteo (Ráfagas) + Met.no (Global)")
+# Refresco en segundo plano: un solo hilo por proceso, compartido por todas las sesiones
+@st.cache_resource
+def get_refresher():
+    return ForecastRefresher(interval=3600).start()
+# Encabezados de la auditoría por clave de proveedor
+AUDIT_LABELS = {'om': "🟠 Open-Meteo (40%)", 'aic': "🔵 AIC (PDF)", 'smn': "⚪ SMN", 'metno': "🌤️ Met.no", 'ens': "🎲 Ensamble"}
+# Curvas horarias: la fusión en trazo grueso y cada fuente punteada
+HOURLY_CHARTS = [("🌡️ Temperatura", 'temp', "°C"), ("💨 Viento", 'wind_speed', "km/h"), ("🌬️ Ráfagas", 'gusts', "km/h")]
+def hourly_figure(hourly, variable, unit):
+    import plotly.graph_objects as go
+    v = hourly['variables'].index(variable)
+    time = hourly['time'].astype('datetime64[s]').astype(datetime.datetime)
+    fig = go.Figure()
+    for s, name in enumerate(hourly['sources']):
+        series = hourly['values'][s, :, v]
+        if np.isnan(series).all(): continue
+        fig.add_trace(go.Scatter(x=time, y=series, name=name, mode="lines", line=dict(width=1, dash="dot"), connectgaps=False))
+    fig.add_trace(go.Scatter(x=time, y=hourly['fused'][:, v], name="Fusión", mode="lines", line=dict(width=3, color="#007bff")))
+    fig.update_layout(height=320, margin=dict(l=10, r=10, t=10, b=10), yaxis_title=unit, hovermode="x unified",
+                      legend=dict(orientation="h", yanchor="bottom", y=1.02, x=0))
+    return fig
+def sky_emoji(desc):
+    desc = desc.lower()
+    if "despejado" in desc or "soleado" in desc: return "☀️"
+    if "parcialmente" in desc: return "⛅"
+    if "lluvia" in desc or "llovizna" in desc: return "🌧️"
+    if "nieve" in desc: return "❄️"
+    if "tormenta" in desc: return "⛈️"
+    if "niebla" in desc: return "🌫️"
+    return "☁️"
+def ensemble_html(ens):
+    # Rango P10–P90 de la máxima y probabilidad de ráfagas fuertes según los miembros del ensamble
+    if not ens or ens.get('max_temp_p10') is None: return ""
+    gusts = ens.get('p_gusts_60')
+    gusts_txt = f" · ráfagas &gt;60: {gusts * 100:.0f}%" if gusts is not None else ""
+    return (f'<div class="ensemble-tag">Máx P10–P90: {ens["max_temp_p10"]:.0f}–{ens["max_temp_p90"]:.0f}°'
+            f'{gusts_txt} ({ens["members"]} miembros)</div>')
+def card_html(day):
+    src_clean = "AIC + Fusión" if "AIC" in day['source'] else "Fusión"
+    return textwrap.dedent(f"""
+    <div class="weather-card">
+        <div class="card-header">{day['date_str']}</div>
+        <div class="card-body">
+            <div class="sky-text">{day['sky_desc']}</div>
+            <div class="weather-icon">{sky_emoji(day['sky_desc'])}</div>
+            <div class="temp-container">
+                <div class="temp-box">
+                    <span class="temp-val-max">{day['max_temp']}°</span>
+                    <span class="temp-label">Máx</span>
+                </div>
+                <div style="width:1px; height:30px; background:var(--text-color); opacity:0.2;"></div>
+                <div class="temp-box">
+                    <span class="temp-val-min">{day['min_temp']}°</span>
+                    <span class="temp-label">Mín</span>
+                </div>
+            </div>
+            <div class="stat-grid">
+                <div class="stat-box">
+                    <div class="stat-label">Viento</div>
+                    <div class="stat-value">{day['wind_speed']} km/h</div>
+                    <div style="font-size:0.7em; opacity:0.7">{day['wind_dir']}</div>
+                </div>
+                <div class="stat-box">
+                    <div class="stat-label">Ráfagas</div>
+                    <div class="stat-value">{day['gusts']} km/h</div>
+                </div>
+            </div>
+            {ensemble_html(day.get('ensemble'))}<div class="source-tag">Fuente: {src_clean}</div>
+        </div>
+    </div>
+    """)
+def audit_html(day):
+    # Una columna por proveedor del registro con su registro crudo
+    d = day['debug']
+    cells = []
+    for key, record in d.items():
+        body = f"<pre>{html.escape(json.dumps(record, default=json_default, ensure_ascii=False, indent=2))}</pre>" if record else "<div class='stat-label'>-</div>"
+        cells.append(f"<div><div class='stat-label'>{html.escape(AUDIT_LABELS.get(key, key))}</div>{body}</div>")
+    return (f"<div class='stat-value'>{day['date_str']}</div>"
+            f"<div class='audit-grid' style='grid-template-columns: repeat({max(len(d), 1)}, 1fr)'>{''.join(cells)}</div>")
+# HTML memoizado por snapshot: las interacciones no vuelven a armar las tarjetas ni la auditoría
+# (el "_" hace que Streamlit no hashee la lista de días; la clave es el snapshot_id)
+@st.cache_data(max_entries=4, show_spinner=False)
+def cards_html(snapshot_id, _days):
+    return [card_html(day) for day in _days[:5]]
+@st.cache_data(max_entries=4, show_spinner=False)
+def audit_days_html(snapshot_id, _days):
+    return "<hr>".join(audit_html(day) for day in _days)
+# Fragmentos: elegir un día o pedir el reporte solo re-ejecuta esta sección, no toda la página
+@st.fragment
+def ai_report_section(forecast_data):
+    selected_day_idx = st.selectbox("Elegir día para generar reporte:", range(len(forecast_data)), format_func=lambda x: forecast_data[x]['date_str'])
+    
+    if st.button("Generar Reporte (IA / Automático)"):
+        if os.environ.get("GOOGLE_API_KEY"):
+             os.environ["GOOGLE_API_KEY"] = os.environ["GOOGLE_API_KEY"].strip()
+        
+        # Carga diferida: Gemini (y su SDK) solo cuando se pide un reporte
+        from ai_reporter import MeteorologistBot
+        bot = MeteorologistBot()
+        day_data = forecast_data[selected_day_idx]
+        with st.spinner(f"Generando reporte para el {day_data['date_str']}..."):
+            # Un solo pedido para los 5 días; los siguientes días salen de la caché
+            report = bot.generate_reports(forecast_data)[selected_day_idx]
+            
+            st.markdown(f"""
+            <div class="ai-report-box">
+                <h4>🎙️ Reporte del Día</h4>
+                <p style="font-family: monospace; font-size: 1.1em;">{report}</p>
+            </div>
+            """, unsafe_allow_html=True)
+@st.fragment
+def audit_section(snapshot):
+    with st.expander("🔎 Desglose de Datos por Fuente (Auditoría)", expanded=True):
+        st.info("Aquí se muestran los datos crudos extraídos antes de la ponderación.")
+        if snapshot and snapshot.metrics:
+            import pandas as pd
+            m = snapshot.metrics
+            st.markdown(f"**⏱️ Costo del refresco:** total {m['total_s']:.2f} s · descarga {m['fetch_s']:.2f} s · fusión {m['fusion_s'] * 1000:.1f} ms")
+            st.dataframe(pd.DataFrame.from_dict(m['providers'], orient='index'), use_container_width=True)
+            summary = REGISTRY.summary()
+            if summary['refreshes']:
+                st.caption(f"Refrescos en este proceso: {summary['refreshes']} · p50 {summary['refresh_p50_s']:.2f} s · p95 {summary['refresh_p95_s']:.2f} s")
+            # Las descargas no re-ejecutan nada
+            e1, e2 = st.columns(2)
+            with e1: st.download_button("Exportar JSON", REGISTRY.to_json(), file_name="metricas.json", mime="application/json", on_click="ignore")
+            with e2: st.download_button("Exportar Prometheus", REGISTRY.to_prometheus(), file_name="metricas.prom", mime="text/plain", on_click="ignore")
+        if snapshot and snapshot.data:
+            st.markdown(audit_days_html(snapshot.snapshot_id, snapshot.data), unsafe_allow_html=True)
 # Sidebar for Configuration
 with st.sidebar:
     st.header("Configuración")
@@ -125,124 +277,46 @@ with st.sidebar:
         st.success("✅ API Key detectada (Sistema)")
     
     if st.button("Forzar Actualización"):
-        st.cache_data.clear()
-        st.rerun()
+        # No bloquea: el refresco corre en segundo plano y la página sigue mostrando el último snapshot
+        get_refresher().request_refresh()
+        st.toast("Actualización solicitada, los datos nuevos aparecerán al recargar.")
 # Main Logic
 try:
-    # Caching: Refresh every 1 hour (3600 seconds)
-    @st.cache_data(ttl=3600, show_spinner="Fusionando datos de SMN, AIC, Met.no y Open-Meteo...")
-    def get_fused_data():
-        engine = FusionEngine()
-        return engine.get_5_day_forecast()
-    
-    forecast_data = get_fused_data()
+    # Snapshot recalculado antes de vencer (cada 1 hora); solo el primer arranque espera
+    refresher = get_refresher()
+    snapshot = refresher.get()
+    if snapshot is None:
+        with st.spinner("Fusionando datos de SMN, AIC, Met.no y Open-Meteo..."):
+            snapshot = refresher.get(wait=30)
+    forecast_data = snapshot.data if snapshot else None
+    if snapshot:
+        status = " · actualizando en segundo plano…" if refresher.refreshing else ""
+        st.caption(f"🕒 Datos de hace {int(snapshot.age // 60)} min{status}")
+    if forecast_data and forecast_data[0].get('dropped'):
+        st.warning(f"Fuentes descartadas por demora: {', '.join(forecast_data[0]['dropped'])}")
+    if forecast_data and forecast_data[0].get('stale'):
+        stale_txt = ', '.join(f"{src} (hace {age // 60} min)" for src, age in forecast_data[0]['stale'].items())
+        st.caption(f"⚠️ Servidor caído, usando copia en caché: {stale_txt}")
+    if forecast_data and forecast_data[0].get('circuits'):
+        circuit_txt = ', '.join(f"{src} (próximo intento en {secs // 60} min)" for src, secs in forecast_data[0]['circuits'].items())
+        st.caption(f"⛔ Fuentes caídas, sin esperar su timeout: {circuit_txt}")
     # Layout: Premium Card Grid
     if forecast_data:
-        cols = st.columns(5)
-        for i, col in enumerate(cols):
-            day = forecast_data[i]
-            
-            # Icon Logic
-            desc = day['sky_desc'].lower()
-            emoji = "☁️"
-            
-            if "despejado" in desc or "soleado" in desc: emoji = "☀️"
-            elif "parcialmente" in desc: emoji = "⛅"
-            elif "lluvia" in desc or "llovizna" in desc: emoji = "🌧️"
-            elif "nieve" in desc: emoji = "❄️"
-            elif "tormenta" in desc: emoji = "⛈️"
-            elif "niebla" in desc: emoji = "🌫️"
-            elif "nublado" in desc or "cubierto" in desc: emoji = "☁️"
-            
-            src_clean = "Fusión"
-            if "AIC" in day['source']: src_clean = "AIC + Fusión"
-            
-            html_card = f"""
-            <div class="weather-card">
-                <div class="card-header">{day['date_str']}</div>
-                <div class="card-body">
-                    <div class="sky-text">{day['sky_desc']}</div>
-                    <div class="weather-icon">{emoji}</div>
-                    <div class="temp-container">
-                        <div class="temp-box">
-                            <span class="temp-val-max">{day['max_temp']}°</span>
-                            <span class="temp-label">Máx</span>
-                        </div>
-                        <div style="width:1px; height:30px; background:var(--text-color); opacity:0.2;"></div>
-                        <div class="temp-box">
-                            <span class="temp-val-min">{day['min_temp']}°</span>
-                            <span class="temp-label">Mín</span>
-                        </div>
-                    </div>
-                    <div class="stat-grid">
-                        <div class="stat-box">
-                            <div class="stat-label">Viento</div>
-                            <div class="stat-value">{day['wind_speed']} km/h</div>
-                            <div style="font-size:0.7em; opacity:0.7">{day['wind_dir']}</div>
-                        </div>
-                        <div class="stat-box">
-                            <div class="stat-label">Ráfagas</div>
-                            <div class="stat-value">{day['gusts']} km/h</div>
-                        </div>
-                    </div>
-                    <div class="source-tag">Fuente: {src_clean}</div>
-                </div>
-            </div>
-            """
-            
-            with col:
-                st.markdown(textwrap.dedent(html_card), unsafe_allow_html=True)
+        for col, card in zip(st.columns(5), cards_html(snapshot.snapshot_id, forecast_data)):
+            with col: st.markdown(card, unsafe_allow_html=True)
     else:
         st.error("No se pudieron obtener datos del pronóstico.")
+    if snapshot and snapshot.hourly is not None:
+        st.markdown("---")
+        st.subheader("📈 Pronóstico Horario")
+        tabs = st.tabs([title for title, _, _ in HOURLY_CHARTS])
+        for tab, (_, variable, unit) in zip(tabs, HOURLY_CHARTS):
+            with tab: st.plotly_chart(hourly_figure(snapshot.hourly, variable, unit), use_container_width=True)
     st.markdown("---")
     st.subheader("🤖 Meteorólogo Virtual (IA)")
-    
-    # Selection for AI Report
-    if forecast_data:
-        selected_day_idx = st.selectbox("Elegir día para generar reporte:", range(len(forecast_data)), format_func=lambda x: forecast_data[x]['date_str'])
-        
-        if st.button("Generar Reporte (IA / Automático)"):
-            if os.environ.get("GOOGLE_API_KEY"):
-                 os.environ["GOOGLE_API_KEY"] = os.environ["GOOGLE_API_KEY"].strip()
-            
-            bot = MeteorologistBot()
-            day_data = forecast_data[selected_day_idx]
-            with st.spinner(f"Generando reporte para el {day_data['date_str']}..."):
-                report = bot.generate_report(day_data)
-                
-                st.markdown(f"""
-                <div class="ai-report-box">
-                    <h4>🎙️ Reporte del Día</h4>
-                    <p style="font-family: monospace; font-size: 1.1em;">{report}</p>
-                </div>
-                """, unsafe_allow_html=True)
-            
+    if forecast_data: ai_report_section(forecast_data)
     st.markdown("---")
-    with st.expander("🔎 Desglose de Datos por Fuente (Auditoría)", expanded=True):
-        st.info("Aquí se muestran los datos crudos extraídos antes de la ponderación.")
-        if forecast_data:
-            for day in forecast_data:
-                st.markdown(f"**{day['date_str']}**")
-                d = day['debug']
-                
-                # Show active sources
-                c1, c2, c3, c4 = st.columns(4)
-                with c1:
-                    st.caption("🟠 Open-Meteo (40%)")
-                    if d['om']: st.json(d['om'])
-                    else: st.warning("-")
-                with c2:
-                    st.caption("🔵 AIC (PDF)")
-                    if d['aic']: st.json(d['aic'])
-                    else: st.warning("-")
-                with c3:
-                    st.caption("⚪ SMN")
-                    st.text(d['smn'])
-                with c4:
-                    st.caption("🌤️ Met.no (NUEVO)")
-                    if d['aw']: st.json(d['aw']) 
-                    else: st.warning("-")
-                st.markdown("---")
+    audit_section(snapshot)
 except Exception as e:
     st.error(f"Ocurrió un error crítico: {e}")
     st.exception(e)
@@ -0,0 +1,92 @@
+import contextlib
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+from records import json_default
+
+ARCHIVE_FILE = os.environ.get("CLIMA_SMA_ARCHIVE", "forecast_archive.sqlite")
+DEFAULT_LOCATION = "CHAPELCO_AERO"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecast (
+    location    TEXT    NOT NULL,
+    issue_time  INTEGER NOT NULL,   -- epoch (s) del refresco que emitió el pronóstico
+    target_date TEXT    NOT NULL,   -- YYYY-MM-DD
+    provider    TEXT    NOT NULL,   -- 'fusion' o clave de la fuente cruda
+    max_temp    REAL,
+    min_temp    REAL,
+    wind_speed  REAL,
+    gusts       REAL,
+    raw         TEXT,               -- registro completo en JSON
+    PRIMARY KEY (location, issue_time, target_date, provider)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS forecast_by_target ON forecast (location, target_date, issue_time);
+"""
+
+def _num(value):
+    return value if isinstance(value, (int, float)) else None
+
+class ForecastArchive:
+    # Archivo append-only de cada refresco: fusión + valores crudos de cada fuente.
+    # La PK (location, issue_time, target_date) y el índice por target_date hacen que
+    # las consultas por fecha objetivo o por emisión sean búsquedas en índice.
+    def __init__(self, path=ARCHIVE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn: yield conn
+        finally:
+            conn.close()
+
+    def append(self, forecast, location=DEFAULT_LOCATION, issue_time=None):
+        issue_time = int(issue_time or time.time())
+        rows = []
+        for day in forecast:
+            target = day['date'].isoformat()
+            fused = {k: v for k, v in day.items() if k != 'debug'}
+            rows.append((location, issue_time, target, 'fusion', _num(day.get('max_temp')), _num(day.get('min_temp')),
+                         _num(day.get('wind_speed')), _num(day.get('gusts')), json.dumps(fused, default=json_default)))
+            # Cada registro crudo de day_summary['debug'] (una clave por proveedor registrado)
+            for source, rec in (day.get('debug') or {}).items():
+                if not rec: continue
+                rows.append((location, issue_time, target, source, _num(rec.get('max_temp')), _num(rec.get('min_temp')),
+                             _num(rec.get('wind_speed')), _num(rec.get('gusts')), json.dumps(rec, default=json_default)))
+        with self._lock, self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO forecast VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def _query(self, sql, params):
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def forecasts_for(self, target_date, location=DEFAULT_LOCATION, since=None, until=None, provider=None):
+        # Todo lo emitido para una fecha objetivo (opcionalmente en una ventana de emisión)
+        if isinstance(target_date, datetime.date): target_date = target_date.isoformat()
+        sql = ("SELECT * FROM forecast INDEXED BY forecast_by_target"
+               " WHERE location = ? AND target_date = ? AND issue_time BETWEEN ? AND ?")
+        params = [location, target_date, int(since or 0), int(until or 2**62)]
+        if provider:
+            sql += " AND provider = ?"
+            params.append(provider)
+        return self._query(sql + " ORDER BY issue_time, provider", params)
+
+    def issued_between(self, since, until=None, location=DEFAULT_LOCATION, provider='fusion'):
+        # Pronósticos emitidos en una ventana (todas las fechas objetivo)
+        sql = ("SELECT * FROM forecast WHERE location = ? AND issue_time BETWEEN ? AND ? AND provider = ?"
+               " ORDER BY issue_time, target_date")
+        return self._query(sql, [location, int(since), int(until or 2**62), provider])
+
+    def latest_issue(self, location=DEFAULT_LOCATION):
+        rows = self._query("SELECT MAX(issue_time) AS t FROM forecast WHERE location = ?", [location])
+        return rows[0]['t'] if rows else None
@@ -0,0 +1,75 @@
+import argparse
+import collections
+import datetime
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data_sources import SMNIndex, SMNProvider
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pron5d.txt")
+
+def legacy_parse(content, location_id):
+    # Copia del parser original de SMNProvider.get_forecast (una estación por recorrido)
+    lines = content.splitlines()
+    capture = False
+    date_pattern = re.compile(r'(\d{1,2})/([A-Z]{3})/(\d{4})')
+    daily_agg = collections.defaultdict(lambda: {'temps': [], 'winds': []})
+    meses = {"ENE": 1, "FEB": 2, "MAR": 3, "ABR": 4, "MAY": 5, "JUN": 6,
+             "JUL": 7, "AGO": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DIC": 12}
+    for line in lines:
+        if location_id in line:
+            capture = True
+            continue
+        if capture:
+            if "=====" in line and not any(m in line for m in meses):
+                if len(daily_agg) > 0: break
+                else: continue
+            match = date_pattern.search(line)
+            if match:
+                try:
+                    d, m_str, y = match.groups()
+                    date_obj = datetime.date(int(y), meses.get(m_str.upper(), 1), int(d))
+                    nums = re.findall(r"[-+]?\d*\.\d+|\d+", line.split("Hs.")[-1])
+                    if len(nums) >= 3:
+                        daily_agg[date_obj]['temps'].append(float(nums[0]))
+                        daily_agg[date_obj]['winds'].append(float(nums[2]))
+                except: continue
+    return daily_agg
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark del parser pron5d (legacy vs índice de una pasada)")
+    parser.add_argument("path", nargs="?", default=FIXTURE, help="archivo pron5d .txt grabado")
+    parser.add_argument("--station", default="CHAPELCO_AERO")
+    parser.add_argument("-n", "--number", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.path, "rb") as f:
+        raw = f.read()
+    text = raw.decode("latin-1")
+    index = SMNIndex.parse(raw)
+    stations = [s for s in index if len(index[s])]
+    provider = SMNProvider(args.station)
+
+    # Sanidad: ambos parsers deben coincidir para la estación elegida
+    legacy = legacy_parse(text, args.station)
+    new = {f['date']: f for f in provider._to_forecasts(index[args.station])}
+    for date, data in legacy.items():
+        assert int(round(max(data['temps']))) == new[date]['max_temp'], date
+        assert int(round(min(data['temps']))) == new[date]['min_temp'], date
+
+    cases = [
+        ("legacy, 1 estación", lambda: legacy_parse(text, args.station)),
+        (f"legacy, {len(stations)} estaciones", lambda: [legacy_parse(text, s) for s in stations]),
+        (f"índice, {len(stations)} estaciones", lambda: SMNIndex.parse(raw)),
+        (f"índice + diarios, {len(stations)} estaciones", lambda: [provider._to_forecasts(s) for s in SMNIndex.parse(raw).stations.values()]),
+    ]
+    print(f"{args.path}: {len(raw)} bytes, {len(stations)} estaciones, {sum(len(index[s]) for s in stations)} filas")
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=args.number, repeat=3)) / args.number
+        print(f"{name:<40} {best * 1000:9.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import argparse
+import datetime
+import math
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+from fusion_engine import OM_WEIGHT, VARIABLES, records_frame, weighted_fusion
+from http_cache import HTTPCache
+from make_fixtures import FIXTURE_DATE, write_fixtures
+from records import ForecastBatch
+from run_bench import build_engine
+from stub_server import StubServer
+
+# Pronóstico fusionado esperado para los fixtures de FIXTURE_DATE (split fijo, sin skill):
+# días desde FIXTURE_DATE -> (máx, mín, viento, ráfagas, cielo, presión, fuentes)
+EXPECTED = {
+    0: (18, 3, 37, 74, 'Despejado', '1012 hPa', 'Fusion (OM, AIC, SMN, Met.no)'),
+    1: (18, 3, 38, 73, 'Parc. nublado', '1011 hPa', 'Fusion (OM, AIC, SMN, Met.no)'),
+    2: (17, 3, 36, 56, 'Nublado', '1010 hPa', 'Fusion (OM, AIC, SMN, Met.no)'),
+    3: (18, 3, 35, 54, 'Lluvias', '1009 hPa', 'Fusion (OM, AIC, SMN, Met.no)'),
+    4: (18, 4, 38, 29, 'Nevadas', '1008 hPa', 'Fusion (OM, AIC, SMN, Met.no)'),
+}
+
+def summary(day):
+    return (day['max_temp'], day['min_temp'], day['wind_speed'], day['gusts'], day['sky_desc'], day['pressure'], day['source'])
+
+def legacy_fusion(sources, base, factor=None, bias=None):
+    # Copia del promedio por día original (un recorrido por fuente): la base lleva el 40% y las demás
+    # comparten el 60%; sola, el 100%; sin base, todas igual. Solo cuentan las fuentes con máxima y mínima
+    # y el viento faltante cuenta como 0. factor/bias por (fuente, variable) como en SkillTracker.adjustments
+    present = [p for p, values in enumerate(sources) if values is not None]
+    weights = {}
+    if base is None:
+        for p in present: weights[p] = 1.0 / len(present)
+    else:
+        others = [p for p in present if p != base]
+        for p in others: weights[p] = (1.0 - OM_WEIGHT) / len(others)
+        if base in present: weights[base] = OM_WEIGHT if others else 1.0
+    acc = [0.0] * len(VARIABLES)
+    total = [0.0] * len(VARIABLES)
+    for p, weight in weights.items():
+        values = sources[p]
+        if math.isnan(values[0]) or math.isnan(values[1]): continue
+        for v, value in enumerate(values):
+            w = weight * (factor[p][v] if factor is not None else 1.0)
+            if bias is not None: value -= bias[p][v]
+            acc[v] += w * (0.0 if math.isnan(value) else value)
+            total[v] += w
+    return [a / t if t > 0 else math.nan for a, t in zip(acc, total)], total[0]
+
+def check_weighted_fusion(cases, seed=0):
+    # weighted_fusion vectorizado contra legacy_fusion día por día, con huecos, NaN, skill y sin base
+    rnd = np.random.default_rng(seed)
+    for _ in range(cases):
+        n_sources, days = rnd.integers(1, 6), rnd.integers(1, 8)
+        values = rnd.uniform(-10, 40, (n_sources, days, len(VARIABLES))).round()
+        values[rnd.random(values.shape) < 0.15] = np.nan
+        present = rnd.random((n_sources, days)) < 0.7
+        base = None if rnd.random() < 0.25 else int(rnd.integers(n_sources))
+        skill = rnd.random() < 0.5
+        factor = rnd.uniform(0.5, 1.5, values.shape) if skill else None
+        bias = rnd.uniform(-2, 2, values.shape) if skill else None
+        fused, total, _ = weighted_fusion(values, present, base=base, factor=factor, bias=bias)
+        for d in range(days):
+            sources = [values[p, d].tolist() if present[p, d] else None for p in range(n_sources)]
+            expected, expected_total = legacy_fusion(sources, base,
+                                                     factor[:, d].tolist() if skill else None,
+                                                     bias[:, d].tolist() if skill else None)
+            assert math.isclose(total[d], expected_total, abs_tol=1e-12), (d, total[d], expected_total)
+            np.testing.assert_allclose(fused[d], expected, rtol=1e-12, atol=1e-9, equal_nan=True)
+
+def check_batch(batch):
+    # El lote columnar se lee igual que los dicts de los que sale y sobrevive a pickle
+    dicts = batch.to_dicts()
+    again = ForecastBatch.from_records(dicts, batch.source)
+    assert again.to_dicts() == dicts, batch.source
+    assert pickle.loads(pickle.dumps(batch)).to_dicts() == dicts, batch.source
+    frame, legacy = records_frame(batch), records_frame(dicts)
+    if frame is not None or legacy is not None:
+        assert frame.equals(legacy), batch.source
+
+def check_forecast(engine, forecast):
+    # Cada día: el resultado publicado, el recalculado con legacy_fusion sobre los registros de
+    # auditoría de las fuentes que entraron, y el lote de cada fuente
+    specs = [spec for spec in engine.specs if spec.key in engine.enabled and spec.variables]
+    base = next((p for p, spec in enumerate(specs) if spec.base), None)
+    batches = {}
+    for offset, day in enumerate(forecast):
+        assert day['date'] == FIXTURE_DATE + datetime.timedelta(days=offset), day['date']
+        assert summary(day) == EXPECTED[offset], (day['date'], summary(day), EXPECTED[offset])
+        used = day['source'][len("Fusion ("):-1].split(", ")
+        sources = []
+        for spec in specs:
+            record = day['debug'].get(spec.key) if spec.label in used else None
+            if record is None:
+                sources.append(None)
+                continue
+            batches[spec.key] = record.batch
+            sources.append([math.nan if record.get(name) is None else record.get(name) for name in VARIABLES])
+        fused, total = legacy_fusion(sources, base)
+        assert total > 0, day['date']
+        assert [int(round(v)) for v in fused] == [day[name] for name in VARIABLES], (day['date'], fused)
+        ensemble = day.get('ensemble')
+        assert ensemble is not None and ensemble['members'] > 0, day['date']
+    for batch in batches.values(): check_batch(batch)
+
+def run_engine(stub, cache_dir):
+    engine = build_engine(stub, HTTPCache(cache_dir), deadline=30.0, extras=('ensemble',))
+    return engine, engine.get_5_day_forecast(today=FIXTURE_DATE)
+
+def main():
+    parser = argparse.ArgumentParser(description="Regresión offline: fusión de los fixtures de FIXTURE_DATE y weighted_fusion contra el promedio original")
+    parser.add_argument("--cases", type=int, default=500, help="casos aleatorios para weighted_fusion")
+    parser.add_argument("--print", dest="show", action="store_true", help="mostrar el pronóstico en el formato de EXPECTED")
+    args = parser.parse_args()
+
+    check_weighted_fusion(args.cases)
+    print(f"weighted_fusion == legacy_fusion en {args.cases} casos")
+
+    work = tempfile.mkdtemp(prefix="bench-regression-")
+    try:
+        fixtures = os.path.join(work, "fixtures")
+        write_fixtures(FIXTURE_DATE, fixtures)
+        stub = StubServer(fixtures_dir=fixtures, seed=0).start()
+        try:
+            cache_dir = os.path.join(work, "cache")
+            engine, forecast = run_engine(stub, cache_dir)
+            if args.show:
+                for offset, day in enumerate(forecast):
+                    print(f"    {offset}: {summary(day)!r},")
+                return
+            assert not engine.dropped, engine.dropped
+            check_forecast(engine, forecast)
+            # Segunda corrida sobre la misma caché: bbox AIC aprendido, productos desde disco
+            engine, again = run_engine(stub, cache_dir)
+            check_forecast(engine, again)
+        finally:
+            stub.stop()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    print(f"pronóstico de {FIXTURE_DATE} ({len(forecast)} días) == EXPECTED y legacy_fusion")
+
+if __name__ == "__main__":
+    main()
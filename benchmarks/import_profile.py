@@ -0,0 +1,53 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+# Puntos de entrada del proyecto y dependencias cuyo costo de import vigilamos
+MODULES = ("refresher", "api", "fusion_engine", "data_sources", "ai_reporter")
+HEAVY = ("pandas", "pdfplumber", "google.generativeai", "httpx", "plotly", "requests", "streamlit")
+
+def import_time(module, python=sys.executable):
+    # Intérprete nuevo con -X importtime: {módulo: (propio µs, acumulado µs)} de todo lo que se importó
+    proc = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line: continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit(): continue
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+def profile(modules=MODULES, python=sys.executable):
+    results = {}
+    for module in modules:
+        times = import_time(module, python)
+        results[module] = {
+            'cumulative_ms': times.get(module, (0, 0))[1] / 1000,
+            'heavy': {name: times[name][1] / 1000 for name in HEAVY if name in times},
+        }
+    return results
+
+def print_report(results):
+    print("\n== import en frío (-X importtime, intérprete nuevo por módulo)")
+    print(f"{'módulo':<16}{'total ms':>10}  dependencias pesadas cargadas (ms acumulados)")
+    for module, res in results.items():
+        heavy = ", ".join(f"{name} {ms:.0f}" for name, ms in res['heavy'].items()) or "-"
+        print(f"{module:<16}{res['cumulative_ms']:>10.1f}  {heavy}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de tiempo de import (arranque en frío del contenedor)")
+    parser.add_argument("--modules", default=",".join(MODULES))
+    parser.add_argument("--json", dest="json_out", help="guardar resultados en este archivo")
+    args = parser.parse_args()
+    results = profile(args.modules.split(","))
+    print_report(results)
+    if args.json_out:
+        with open(args.json_out, "w") as f: json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
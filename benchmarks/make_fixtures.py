@@ -0,0 +1,236 @@
+import argparse
+import datetime
+import io
+import json
+import math
+import os
+import random
+import zipfile
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# Fecha de emisión de los fixtures; el benchmark fija "hoy" a esta fecha
+FIXTURE_DATE = datetime.date(2026, 10, 17)
+
+MESES = ["ENE", "FEB", "MAR", "ABR", "MAY", "JUN", "JUL", "AGO", "SEP", "OCT", "NOV", "DIC"]
+STATIONS = ["ABRA_PAMPA", "AEROPARQUE", "AZUL_AERO", "BAHIA_BLANCA_AERO", "BARILOCHE_AERO", "BERNARDO_DE_IRIGOYEN",
+            "BOLIVAR_AERO", "BUENOS_AIRES", "CATAMARCA_AERO", "CERES_AERO", "CHAPELCO_AERO", "CHEPES", "CHILECITO",
+            "CIPOLLETTI", "COMODORO_RIVADAVIA_AERO", "CONCORDIA_AERO", "CORDOBA_AERO", "CORRIENTES_AERO", "DOLORES_AERO",
+            "EL_BOLSON_AERO", "EL_CALAFATE_AERO", "ESQUEL_AERO", "EZEIZA_AERO", "FORMOSA_AERO", "GENERAL_PICO_AERO",
+            "IGUAZU_AERO", "JUJUY_AERO", "JUNIN_AERO", "LA_PLATA_AERO", "LA_RIOJA_AERO", "MAQUINCHAO", "MALARGUE_AERO",
+            "MAR_DEL_PLATA_AERO", "MENDOZA_AERO", "NEUQUEN_AERO", "PARANA_AERO", "POSADAS_AERO", "RESISTENCIA_AERO",
+            "RIO_GALLEGOS_AERO", "RIO_GRANDE_B.A.", "ROSARIO_AERO", "SALTA_AERO", "SAN_JUAN_AERO", "SAN_LUIS_AERO",
+            "SANTA_ROSA_AERO", "TRELEW_AERO", "TUCUMAN_AERO", "USHUAIA_AERO", "VIEDMA_AERO", "ZAPALA_AERO"]
+
+def build_pron5d(start, seed=7):
+    # Texto pron5d (latin-1, CRLF) con el layout del producto: encabezado, bloques ===== y filas cada 3 h
+    rnd = random.Random(seed)
+    t0 = datetime.datetime.combine(start, datetime.time(0))
+    out = []
+    for st in STATIONS:
+        out.append(st)
+        out.append("=" * 65)
+        out.append(" FECHA *           TEMPERATURA        VIENTO          PRECIPITACION")
+        out.append("                       (\xb0C)      direcci\xf3n(grados)|velocidad(km/h)     (mm)")
+        out.append("=" * 65)
+        base = rnd.uniform(2, 25)
+        for i in range(40):
+            t = t0 + datetime.timedelta(hours=3 * i)
+            temp = base + 6 * rnd.uniform(-1, 1)
+            out.append(f" {t.day:02d}/{MESES[t.month - 1]}/{t.year} {t.hour:02d}Hs.{temp:12.1f}{rnd.randint(0, 359):10d} | "
+                       f"{rnd.randint(0, 60):3d}{rnd.choice([0.0, 0.0, 0.0, 0.4, 2.1, 7.5]):14.1f}")
+        out.append("=" * 65)
+        out.append("")
+    return "\r\n".join(out).encode("latin-1")
+
+def build_pron5d_zip(text):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        # Fecha fija dentro del zip para que el fixture sea reproducible
+        info = zipfile.ZipInfo("pron_5d.txt", date_time=(2026, 1, 1, 0, 0, 0))
+        info.compress_type = zipfile.ZIP_DEFLATED
+        z.writestr(info, text)
+    return buf.getvalue()
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def build_aic_pdf(start, days=5):
+    # PDF mínimo (A4 apaisado) con una tabla con bordes al estilo del extendido AIC
+    labels = ["Fecha", "Momento", "Cielo", "Temperatura", "Viento (km/h)", "Ráfagas (km/h)", "Dirección", "Presión (hPa)"]
+    skies = ["Despejado", "Parc. nublado", "Nublado", "Lluvias", "Nevadas"]
+    dirs = ["O", "NO", "SO", "N", "S"]
+    rows = [[label] for label in labels]
+    for d in range(days):
+        rows[0] += [(start + datetime.timedelta(days=d)).strftime("%d-%m-%Y"), ""]
+        rows[1] += ["Día", "Noche"]
+        rows[2] += [skies[d % 5], skies[(d + 1) % 5]]
+        rows[3] += [f"{18 + d}°", f"{4 + d}°"]
+        rows[4] += [f"{15 + 5 * d}", f"{10 + 3 * d}"]
+        rows[5] += [f"{30 + 8 * d}", f"{20 + 4 * d}"]
+        rows[6] += [dirs[d % 5], dirs[(d + 2) % 5]]
+        rows[7] += [f"{1012 - d}", f"{1010 - d}"]
+
+    x0, y_top, label_w, col_w, row_h = 40, 520, 110, 68, 24
+    xs = [x0, x0 + label_w] + [x0 + label_w + col_w * (i + 1) for i in range(len(rows[0]) - 1)]
+    ys = [y_top - row_h * i for i in range(len(rows) + 1)]
+    ops = ["0.5 w"]
+    for y in ys: ops.append(f"{xs[0]} {y} m {xs[-1]} {y} l S")
+    for x in xs: ops.append(f"{x} {ys[0]} m {x} {ys[-1]} l S")
+    ops.append("BT /F1 16 Tf 40 555 Td (" + _pdf_escape("Pronóstico extendido - Cuenca Lanín") + ") Tj ET")
+    for r, row in enumerate(rows):
+        for c, text in enumerate(row):
+            if not text: continue
+            ops.append(f"BT /F1 {7 if c else 8} Tf {xs[c] + 3} {ys[r] - 15} Td ({_pdf_escape(text)}) Tj ET")
+    stream = "\n".join(ops).encode("latin-1")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 842 595] /Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets: out += f"{off:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+def build_open_meteo(start, days=16, seed=11):
+    rnd = random.Random(seed)
+    dates = [start + datetime.timedelta(days=i) for i in range(days)]
+    tmax = [round(16 + 6 * math.sin(i / 3) + rnd.uniform(-2, 2), 1) for i in range(days)]
+    # Serie horaria (generador aparte para no alterar los valores diarios)
+    hrnd = random.Random(seed + 1)
+    hours = [datetime.datetime.combine(start, datetime.time(0)) + datetime.timedelta(hours=h) for h in range(24 * days)]
+    temps = [round(10 + 8 * math.sin((t.hour - 9) / 24 * 2 * math.pi) + hrnd.uniform(-1, 1), 1) for t in hours]
+    winds = [round(hrnd.uniform(3, 35), 1) for _ in hours]
+    return {
+        "latitude": -40.125, "longitude": -71.375, "generationtime_ms": 0.41, "utc_offset_seconds": -10800,
+        "timezone": "America/Argentina/Buenos_Aires", "timezone_abbreviation": "GMT-3", "elevation": 642.0,
+        "hourly_units": {"time": "iso8601", "temperature_2m": "°C", "wind_speed_10m": "km/h", "wind_gusts_10m": "km/h"},
+        "hourly": {
+            "time": [t.strftime("%Y-%m-%dT%H:%M") for t in hours],
+            "temperature_2m": temps,
+            "wind_speed_10m": winds,
+            "wind_gusts_10m": [round(w * hrnd.uniform(1.3, 1.9), 1) for w in winds],
+        },
+        "daily_units": {"time": "iso8601", "wind_gusts_10m_max": "km/h", "temperature_2m_max": "°C", "temperature_2m_min": "°C",
+                        "weather_code": "wmo code", "wind_speed_10m_max": "km/h", "wind_direction_10m_dominant": "°"},
+        "daily": {
+            "time": [d.isoformat() for d in dates],
+            "wind_gusts_10m_max": [round(rnd.uniform(20, 75), 1) for _ in dates],
+            "temperature_2m_max": tmax,
+            "temperature_2m_min": [round(t - rnd.uniform(8, 14), 1) for t in tmax],
+            "weather_code": [rnd.choice([0, 1, 2, 3, 61, 80]) for _ in dates],
+            "wind_speed_10m_max": [round(rnd.uniform(8, 40), 1) for _ in dates],
+            "wind_direction_10m_dominant": [rnd.randint(0, 359) for _ in dates],
+        },
+    }
+
+def build_metno(start, seed=13):
+    # locationforecast/2.0/compact: horario las primeras 60 h, luego cada 6 h hasta ~9 días
+    rnd = random.Random(seed)
+    t0 = datetime.datetime.combine(start, datetime.time(3))
+    steps = [t0 + datetime.timedelta(hours=h) for h in range(60)]
+    steps += [steps[-1] + datetime.timedelta(hours=6 * i) for i in range(1, 29)]
+    series = []
+    for i, t in enumerate(steps):
+        hour_local = (t.hour - 3) % 24
+        entry = {"time": t.strftime("%Y-%m-%dT%H:%M:%SZ"), "data": {"instant": {"details": {
+            "air_pressure_at_sea_level": round(1010 + rnd.uniform(-6, 6), 1),
+            "air_temperature": round(9 + 8 * math.sin((hour_local - 9) / 24 * 2 * math.pi) + rnd.uniform(-1.5, 1.5), 1),
+            "cloud_area_fraction": round(rnd.uniform(0, 100), 1),
+            "relative_humidity": round(rnd.uniform(35, 95), 1),
+            "wind_from_direction": round(rnd.uniform(0, 360), 1),
+            "wind_speed": round(rnd.uniform(0.5, 12), 1),
+        }}}}
+        symbol = {"summary": {"symbol_code": rnd.choice(["clearsky_day", "fair_day", "cloudy", "lightrain"])}}
+        if i < 60:
+            entry["data"]["next_1_hours"] = dict(symbol, details={"precipitation_amount": rnd.choice([0.0, 0.0, 0.2, 1.1])})
+        entry["data"]["next_6_hours"] = dict(symbol, details={"precipitation_amount": rnd.choice([0.0, 0.4, 2.3])})
+        series.append(entry)
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [-71.35, -40.15, 642]},
+        "properties": {
+            "meta": {"updated_at": t0.strftime("%Y-%m-%dT%H:%M:%SZ"), "units": {
+                "air_pressure_at_sea_level": "hPa", "air_temperature": "celsius", "cloud_area_fraction": "%",
+                "precipitation_amount": "mm", "relative_humidity": "%", "wind_from_direction": "degrees", "wind_speed": "m/s"}},
+            "timeseries": series,
+        },
+    }
+
+def build_open_meteo_ensemble(start, days=7, members=31, seed=17):
+    # /v1/ensemble: control ("temperature_2m") + miembros "temperature_2m_memberNN", horario
+    rnd = random.Random(seed)
+    hours = [datetime.datetime.combine(start, datetime.time(0)) + datetime.timedelta(hours=h) for h in range(24 * days)]
+    hourly = {"time": [t.strftime("%Y-%m-%dT%H:%M") for t in hours]}
+    for m in range(members):
+        suffix = f"_member{m:02d}" if m else ""
+        shift, gain = rnd.uniform(-3, 3), rnd.uniform(0.7, 1.4)
+        hourly["temperature_2m" + suffix] = [round(10 + shift + 8 * math.sin((t.hour - 9) / 24 * 2 * math.pi) + rnd.uniform(-1, 1), 1) for t in hours]
+        winds = [round(gain * rnd.uniform(3, 35), 1) for _ in hours]
+        hourly["wind_speed_10m" + suffix] = winds
+        hourly["wind_gusts_10m" + suffix] = [round(w * rnd.uniform(1.3, 1.9), 1) for w in winds]
+    return {
+        "latitude": -40.125, "longitude": -71.375, "generationtime_ms": 3.7, "utc_offset_seconds": -10800,
+        "timezone": "America/Argentina/Buenos_Aires", "timezone_abbreviation": "GMT-3", "elevation": 642.0,
+        "hourly_units": {"time": "iso8601", "temperature_2m": "°C", "wind_speed_10m": "km/h", "wind_gusts_10m": "km/h"},
+        "hourly": hourly,
+    }
+
+def build_open_meteo_grid(start, days=7, seed=19, elevations=(640, 630, 660, 930, 1250, 1980, 780, 780, 950)):
+    # Respuesta multi-ubicación de /v1/forecast: una entrada por punto de spatial.BASIN_POINTS (mismo orden)
+    rnd = random.Random(seed)
+    hours = [datetime.datetime.combine(start, datetime.time(0)) + datetime.timedelta(hours=h) for h in range(24 * days)]
+    locations = []
+    for elevation in elevations:
+        # Más frío y más ventoso con la altura
+        offset = -0.0065 * (elevation - 640) + rnd.uniform(-0.5, 0.5)
+        winds = [round(rnd.uniform(3, 35) * (1 + (elevation - 640) / 2000), 1) for _ in hours]
+        locations.append({
+            "latitude": -40.1, "longitude": -71.3, "generationtime_ms": 0.2, "utc_offset_seconds": -10800,
+            "timezone": "America/Argentina/Buenos_Aires", "timezone_abbreviation": "GMT-3", "elevation": float(elevation),
+            "hourly_units": {"time": "iso8601", "temperature_2m": "°C", "wind_speed_10m": "km/h", "wind_gusts_10m": "km/h"},
+            "hourly": {
+                "time": [t.strftime("%Y-%m-%dT%H:%M") for t in hours],
+                "temperature_2m": [round(10 + offset + 8 * math.sin((t.hour - 9) / 24 * 2 * math.pi) + rnd.uniform(-1, 1), 1) for t in hours],
+                "wind_speed_10m": winds,
+                "wind_gusts_10m": [round(w * rnd.uniform(1.3, 1.9), 1) for w in winds],
+            },
+        })
+    return locations
+
+def write_fixtures(start, out):
+    # Todos los fixtures (deterministas por semilla) en out; devuelve {archivo: bytes escritos}
+    os.makedirs(out, exist_ok=True)
+    text = build_pron5d(start)
+    files = {
+        "pron5d.txt": text,
+        "pron5d.zip": build_pron5d_zip(text),
+        "aic_extendido.pdf": build_aic_pdf(start),
+        "open_meteo_daily.json": json.dumps(build_open_meteo(start)).encode(),
+        "metno_compact.json": json.dumps(build_metno(start)).encode(),
+        "open_meteo_ensemble.json": json.dumps(build_open_meteo_ensemble(start)).encode(),
+        "open_meteo_grid.json": json.dumps(build_open_meteo_grid(start)).encode(),
+    }
+    for name, data in files.items():
+        with open(os.path.join(out, name), "wb") as f: f.write(data)
+    return {name: len(data) for name, data in files.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera los fixtures offline de los proveedores")
+    parser.add_argument("--date", default=FIXTURE_DATE.isoformat(), help="fecha de emisión (YYYY-MM-DD)")
+    parser.add_argument("--out", default=FIXTURES_DIR)
+    args = parser.parse_args()
+    for name, size in write_fixtures(datetime.date.fromisoformat(args.date), args.out).items():
+        print(f"{name:<24} {size:>8} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+from fusion_engine import FusionEngine
+from http_cache import HTTPCache
+import import_profile
+from make_fixtures import FIXTURE_DATE
+from stub_server import StubServer, parse_spec
+
+PROVIDERS = ("smn", "aic", "om", "metno")
+STAGES = ("total_s", "ttfb_s", "transfer_s", "parse_s")
+
+def build_engine(stub, cache, deadline, ttl=None, extras=None):
+    # FusionEngine real apuntado al servidor local y aislado del estado de producción: split fijo (sin leer
+    # ni escribir skill_state.json) y cortocircuitos en el directorio de la caché temporal (cache.circuits)
+    engine = FusionEngine(deadline=deadline, cache=cache, skill=False, extras=extras)
+    providers = engine.providers
+    providers['smn'].zip_url = stub.url("smn") + "?dato=pron5d"
+    providers['aic'].pdf_url = stub.url("aic") + "?a=1029&z=1750130550"
+    providers['om'].base_url = stub.url("om")
+    providers['metno'].url = stub.url("metno")
+    providers['ens'].base_url = stub.url("ens")
+    providers['grid'].base_url = stub.url("grid")
+    if ttl is not None:
+        for provider in providers.values(): provider.cache_ttl = ttl
+    return engine
+
+def run_scenario(name, stub, runs, deadline):
+    # cold: caché vacía en cada corrida; revalidate: TTL 0 -> 304 sin re-parseo; warm: todo desde caché
+    samples = []
+    shared_dir = tempfile.mkdtemp(prefix="bench-cache-")
+    try:
+        if name != "cold":
+            build_engine(stub, HTTPCache(shared_dir), deadline).get_5_day_forecast(today=FIXTURE_DATE)
+        shared = HTTPCache(shared_dir)
+        for _ in range(runs):
+            if name == "cold":
+                run_dir = tempfile.mkdtemp(prefix="bench-cache-")
+                engine = build_engine(stub, HTTPCache(run_dir), deadline)
+            else:
+                engine = build_engine(stub, shared, deadline, ttl=0 if name == "revalidate" else None)
+            start = time.perf_counter()
+            data = engine.get_5_day_forecast(today=FIXTURE_DATE)
+            wall = time.perf_counter() - start
+            if name == "cold": shutil.rmtree(run_dir, ignore_errors=True)
+            sample = engine.metrics.to_dict()
+            sample['wall_s'] = wall
+            sample['sources'] = data[0]['source'] if data else None
+            samples.append(sample)
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+    return samples
+
+def _stats(values):
+    values = [v for v in values if v is not None]
+    if not values: return None
+    ordered = sorted(values)
+    return {
+        'min': ordered[0],
+        'p50': statistics.median(ordered),
+        'p95': ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+    }
+
+def summarize(samples):
+    rows = {
+        'end-to-end (wall)': _stats([s['wall_s'] for s in samples]),
+        'fetch': _stats([s['fetch_s'] for s in samples]),
+        'fusion': _stats([s['fusion_s'] for s in samples]),
+    }
+    for provider in PROVIDERS:
+        for stage in STAGES:
+            rows[f"{provider}.{stage[:-2]}"] = _stats([s['providers'].get(provider, {}).get(stage) for s in samples])
+    cache = {p: sorted({str(s['providers'].get(p, {}).get('cache')) for s in samples}) for p in PROVIDERS}
+    return rows, cache
+
+def print_report(name, samples):
+    rows, cache = summarize(samples)
+    print(f"\n== {name} ({len(samples)} corridas) — fuentes: {samples[-1]['sources']}")
+    print(f"{'etapa':<22}{'min ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for stage, st in rows.items():
+        if st is None: continue
+        print(f"{stage:<22}{st['min'] * 1000:>10.2f}{st['p50'] * 1000:>10.2f}{st['p95'] * 1000:>10.2f}")
+    print("caché: " + ", ".join(f"{p}={'/'.join(v)}" for p, v in cache.items()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline de FusionEngine.get_5_day_forecast contra un servidor local")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scenarios", default="cold,revalidate,warm")
+    parser.add_argument("--deadline", type=float, default=12.0)
+    parser.add_argument("--latency", help="latencia por proveedor en segundos, ej: smn=0.8,aic=1.2,om=0.2,metno=0.3")
+    parser.add_argument("--fail", help="probabilidad de 503 por proveedor, ej: aic=0.5")
+    parser.add_argument("--hang", help="proveedores que nunca responden, ej: smn")
+    parser.add_argument("--json", dest="json_out", help="guardar resultados crudos en este archivo")
+    parser.add_argument("--no-imports", action="store_true", help="omitir el perfil de import en frío")
+    args = parser.parse_args()
+
+    stub = StubServer(latency=parse_spec(args.latency), fail=parse_spec(args.fail),
+                      hang=[h for h in (args.hang or "").split(",") if h], seed=0).start()
+    results = {}
+    try:
+        for name in args.scenarios.split(","):
+            results[name] = run_scenario(name, stub, args.runs, args.deadline)
+            print_report(name, results[name])
+    finally:
+        stub.stop()
+    imports = None
+    if not args.no_imports:
+        imports = import_profile.profile()
+        import_profile.print_report(imports)
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            out = {name: {'samples': s, 'summary': summarize(s)[0]} for name, s in results.items()}
+            if imports: out['imports'] = imports
+            json.dump(out, f, indent=2, default=str)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import hashlib
+import http.server
+import os
+import random
+import threading
+import time
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Ruta local -> (proveedor, fixture, content-type)
+ROUTES = {
+    "/dpd/zipopendata.php": ("smn", "pron5d.zip", "application/zip"),
+    "/sitio/extendido-pdf": ("aic", "aic_extendido.pdf", "application/pdf"),
+    "/v1/forecast": ("om", "open_meteo_daily.json", "application/json"),
+    "/weatherapi/locationforecast/2.0/compact": ("metno", "metno_compact.json", "application/json"),
+    "/v1/ensemble": ("ens", "open_meteo_ensemble.json", "application/json"),
+    "/grid/v1/forecast": ("grid", "open_meteo_grid.json", "application/json"),
+}
+
+def parse_spec(text, cast=float):
+    # "smn=0.8,aic=1.5" -> {'smn': 0.8, 'aic': 1.5}
+    spec = {}
+    for part in (text or "").split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            spec[name.strip()] = cast(value)
+    return spec
+
+class StubServer:
+    # Servidor HTTP local que imita los upstreams con latencia y fallas configurables.
+    # latency: segundos por proveedor; fail: probabilidad de 503; hang: proveedores que nunca responden a tiempo
+    def __init__(self, host="127.0.0.1", port=0, fixtures_dir=FIXTURES_DIR, latency=None, fail=None, hang=None, seed=None):
+        self.fixtures = {}
+        for path, (provider, name, ctype) in ROUTES.items():
+            with open(os.path.join(fixtures_dir, name), "rb") as f: body = f.read()
+            self.fixtures[path] = (provider, body, ctype, '"' + hashlib.sha256(body).hexdigest()[:16] + '"')
+        self.latency = latency or {}
+        self.fail = fail or {}
+        self.hang = set(hang or [])
+        self.requests = []
+        self._random = random.Random(seed)
+        self._server = http.server.ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, provider):
+        for path, (name, _, _, _) in self.fixtures.items():
+            if name == provider: return self.base_url + path
+        raise KeyError(provider)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                route = stub.fixtures.get(self.path.split("?", 1)[0])
+                if route is None:
+                    self.send_error(404)
+                    return
+                provider, body, ctype, etag = route
+                stub.requests.append((provider, time.time()))
+                if provider in stub.hang:
+                    time.sleep(3600)
+                delay = stub.latency.get(provider, 0.0)
+                if delay: time.sleep(delay)
+                if stub._random.random() < stub.fail.get(provider, 0.0):
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que sirve los fixtures de los proveedores")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", help="segundos por proveedor, ej: smn=0.8,aic=1.5")
+    parser.add_argument("--fail", help="probabilidad de 503 por proveedor, ej: aic=0.5")
+    parser.add_argument("--hang", help="proveedores que nunca responden, ej: smn,aic")
+    args = parser.parse_args()
+    stub = StubServer(port=args.port, latency=parse_spec(args.latency), fail=parse_spec(args.fail),
+                      hang=[h for h in (args.hang or "").split(",") if h]).start()
+    print(f"Sirviendo fixtures en {stub.base_url}")
+    for provider in ("smn", "aic", "om", "metno", "ens", "grid"): print(f"  {provider:<6} {stub.url(provider)}")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+if __name__ == "__main__":
+    main()
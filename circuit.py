@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+import urllib.parse
+from http_cache import CACHE_DIR, atomic_write
+
+# Estado de los cortocircuitos: un archivo por directorio de caché (cada HTTPCache tiene el suyo)
+CIRCUIT_NAME = "circuits.json"
+# Fallas consecutivas para abrir y segundos abierto antes de la sonda
+THRESHOLD = 3
+COOLDOWN = 300
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+class CircuitBreaker:
+    # Cortocircuito por proveedor y host: closed -> open tras THRESHOLD fallas seguidas; abierto, las llamadas
+    # no tocan la red. Vencido el cooldown una sola sonda en segundo plano (half_open) decide si cierra.
+    def __init__(self, name, registry, threshold=THRESHOLD, cooldown=COOLDOWN):
+        self.name = name
+        self.registry = registry
+        self.threshold = threshold
+        self.cooldown = cooldown
+
+    @property
+    def state(self):
+        return self.registry.state(self.name)['state']
+
+    def allow(self):
+        return self.registry.state(self.name)['state'] == CLOSED
+
+    def retry_in(self):
+        st = self.registry.state(self.name)
+        if st['state'] == CLOSED: return 0
+        return max(0, st['opened_at'] + self.cooldown - time.time())
+
+    def claim_probe(self):
+        # Solo un proceso/hilo obtiene la sonda por período de cooldown (una sonda perdida se reintenta)
+        def claim(st):
+            if st['state'] == CLOSED: return False
+            since = st['opened_at'] if st['state'] == OPEN else st['probe_at']
+            if time.time() < since + self.cooldown: return False
+            st['state'] = HALF_OPEN
+            st['probe_at'] = time.time()
+            return True
+        return self.registry.update(self.name, claim)
+
+    def record_success(self):
+        def close(st):
+            changed = st['state'] != CLOSED or st['failures']
+            st.update(state=CLOSED, failures=0, opened_at=0)
+            return changed
+        self.registry.update(self.name, close)
+
+    def record_failure(self):
+        def fail(st):
+            st['failures'] += 1
+            # Sonda fallida o demasiadas fallas: (re)abre y reinicia el cooldown
+            if st['state'] == HALF_OPEN or st['failures'] >= self.threshold:
+                if st['state'] != OPEN: print(f"Circuit: {self.name} abierto tras {st['failures']} fallas")
+                st.update(state=OPEN, opened_at=time.time())
+            return True
+        self.registry.update(self.name, fail)
+
+class CircuitRegistry:
+    # Estado de todos los cortocircuitos en un archivo JSON: compartido entre sesiones de Streamlit
+    # (mismo proceso) y entre procesos. Se relee solo cuando cambia el mtime del archivo.
+    def __init__(self, path=os.path.join(CACHE_DIR, CIRCUIT_NAME)):
+        self.path = path
+        self._lock = threading.Lock()
+        self._states = {}
+        self._mtime = None
+        self._breakers = {}
+
+    def _sync(self):
+        try: mtime = os.stat(self.path).st_mtime_ns
+        except OSError: return
+        if mtime == self._mtime: return
+        try:
+            with open(self.path, 'r') as f: self._states = json.load(f)
+            self._mtime = mtime
+        except (OSError, ValueError): pass
+
+    def _default(self):
+        return {'state': CLOSED, 'failures': 0, 'opened_at': 0, 'probe_at': 0}
+
+    def state(self, name):
+        with self._lock:
+            self._sync()
+            return dict(self._states.get(name) or self._default())
+
+    def update(self, name, fn):
+        # fn(estado) modifica en el lugar y devuelve True si hay que persistir
+        with self._lock:
+            self._sync()
+            st = self._states.setdefault(name, self._default())
+            changed = fn(st)
+            if changed:
+                try:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    atomic_write(self.path, json.dumps(self._states).encode())
+                    self._mtime = os.stat(self.path).st_mtime_ns
+                except OSError as e: print(f"Circuit Save Error: {e}")
+            return changed
+
+    def breaker(self, name, url=None):
+        # Clave "proveedor@host": un servidor local o de prueba no abre el circuito del upstream real
+        host = urllib.parse.urlsplit(url).netloc if url else ""
+        key = f"{name}@{host}" if host else name
+        with self._lock:
+            if key not in self._breakers: self._breakers[key] = CircuitBreaker(key, self)
+            return self._breakers[key]
+
+    def open_circuits(self):
+        with self._lock:
+            self._sync()
+            return [name for name, st in self._states.items() if st['state'] != CLOSED]
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+def get_registry(directory=CACHE_DIR):
+    # Un registro por directorio de caché dentro del proceso (comparten el lock y los breakers)
+    path = os.path.abspath(os.path.join(directory, CIRCUIT_NAME))
+    with _shared_lock:
+        if path not in _shared: _shared[path] = CircuitRegistry(path)
+        return _shared[path]
@@ -1,207 +1,551 @@
 import os
 import zipfile
-import collections
-import requests
 import io
 import datetime
 import re
-import pdfplumber
 import json
+import hashlib
+import functools
 import time
-class SMNProvider:
-    def __init__(self, location_id="CHAPELCO_AERO"):
-        self.location_id = location_id
-        self.zip_url = "https://ssl.smn.gob.ar/dpd/zipopendata.php?dato=pron5d"
-        self.cache_file = "smn_cache.json"
-        
-    def _load_cache(self):
+import zoneinfo
+from array import array
+import numpy as np
+from http_cache import get_cache, atomic_write
+from metrics import ProviderStats
+from records import ForecastBatch, json_default
+
+# Tokens del producto pron5d (bytes latin-1): encabezado de estación, separador "=====" o fila de datos.
+# Fila: 28/ENE/2026 00Hs.   12.3   250 |  15   0.0  (temp, dir grados | vel km/h, precip mm)
+_SMN_TOKEN = re.compile(
+    rb'^[ \t]*(?:'
+    rb'(?P<station>[A-Z][A-Z0-9_.]+)[ \t]*\r?$'
+    rb'|(?P<sep>={5,})'
+    rb'|(?P<day>\d{1,2})/(?P<mon>[A-Z]{3})/(?P<year>\d{4})[ \t]+(?P<hour>\d{1,2})Hs\.[ \t]*'
+    rb'(?P<temp>[-+]?\d+(?:\.\d+)?)[ \t]+(?P<dir>\d+)[ \t]*\|[ \t]*(?P<speed>\d+(?:\.\d+)?)'
+    rb'(?:[ \t]+(?P<precip>\d+(?:\.\d+)?))?'
+    rb')', re.M)
+_SMN_MESES = {b"ENE": 1, b"FEB": 2, b"MAR": 3, b"ABR": 4, b"MAY": 5, b"JUN": 6,
+              b"JUL": 7, b"AGO": 8, b"SEP": 9, b"OCT": 10, b"NOV": 11, b"DIC": 12}
+
+# Identificadores de emisión que se leen del cuerpo crudo sin parsearlo
+_METNO_UPDATED = re.compile(rb'"updated_at"\s*:\s*"([^"]+)"')
+_OM_GENERATION = re.compile(rb'"generationtime_ms"\s*:\s*[-+0-9.eE]+')
+_PDF_DATE = re.compile(rb'/(?:ModDate|CreationDate)\s*\(D:(\d{8,14})')
+
+# Decodificador incremental: cada ítem de la serie se decodifica y se descarta por separado
+_JSON_DECODER = json.JSONDecoder()
+_JSON_GAP = re.compile(r'[\s,]*')
+LOCAL_TZ = "America/Argentina/Buenos_Aires"
+
+def _zone(name):
+    try: return zoneinfo.ZoneInfo(name)
+    except zoneinfo.ZoneInfoNotFoundError:
+        # Sin base tzdata (Windows sin el paquete): Argentina no tiene horario de verano
+        return datetime.timezone(datetime.timedelta(hours=-3))
+
+@functools.lru_cache(maxsize=8192)
+def local_hour(stamp, tz_name=LOCAL_TZ):
+    # "2026-10-17T03" (hora UTC) -> horas desde 0001-01-01 en la hora local (eje de SMNStation.hours).
+    # Memoizado: en corridas de varias ubicaciones los mismos pasos se convierten una sola vez
+    utc = datetime.datetime(int(stamp[:4]), int(stamp[5:7]), int(stamp[8:10]), int(stamp[11:13]), tzinfo=datetime.timezone.utc)
+    local = utc.astimezone(_zone(tz_name))
+    return local.toordinal() * 24 + local.hour
+
+def iter_json_array(text, key):
+    # Ítems del primer arreglo "key" del documento, de a uno con raw_decode: nunca se arma el árbol completo
+    start = text.find(f'"{key}"')
+    if start < 0: return
+    pos = text.index('[', start) + 1
+    while True:
+        pos = _JSON_GAP.match(text, pos).end()
+        if pos >= len(text) or text[pos] == ']': return
+        item, pos = _JSON_DECODER.raw_decode(text, pos)
+        yield item
+
+def iter_json_object(text, key):
+    # Pares (nombre, valor) del primer objeto "key" del documento, de a uno con raw_decode (como iter_json_array)
+    start = text.find(f'"{key}"')
+    if start < 0: return
+    pos = text.index('{', start) + 1
+    while True:
+        pos = _JSON_GAP.match(text, pos).end()
+        if pos >= len(text) or text[pos] == '}': return
+        name, pos = _JSON_DECODER.raw_decode(text, pos)
+        pos = _JSON_GAP.match(text, text.index(':', pos) + 1).end()
+        value, pos = _JSON_DECODER.raw_decode(text, pos)
+        yield name, value
+
+def issuance_of(response, extract):
+    # Emisión / corrida de modelo del producto; sin una reconocible, la versión del cuerpo
+    try: issuance = extract(response.content)
+    except Exception: issuance = None
+    return issuance or response.digest[:16]
+
+def deg_to_cardinal(deg):
+    dirs = ["N", "NE", "E", "SE", "S", "SO", "O", "NO"]
+    return dirs[round(deg / 45) % 8]
+
+class SMNStation:
+    # Sección de una estación: offsets en bytes + columnas compactas
+    __slots__ = ('station_id', 'offset', 'blocks', 'hours', 'temp', 'wind_dir', 'wind_speed', 'precip')
+
+    def __init__(self, station_id, offset):
+        self.station_id = station_id
+        self.offset = offset                 # byte offset del encabezado
+        self.blocks = []                     # byte offsets de cada línea "====="
+        self.hours = array('l')              # horas desde 0001-01-01 (ordinal * 24 + hora local)
+        self.temp = array('f')
+        self.wind_dir = array('H')
+        self.wind_speed = array('f')
+        self.precip = array('f')
+
+    def __len__(self):
+        return len(self.hours)
+
+    def rows(self):
+        # (datetime, temp, dir, vel, precip) reconstruidos desde las columnas
+        for i, h in enumerate(self.hours):
+            dt = datetime.datetime.combine(datetime.date.fromordinal(h // 24), datetime.time(h % 24))
+            yield dt, self.temp[i], self.wind_dir[i], self.wind_speed[i], self.precip[i]
+
+    def daily(self):
+        # Agregado diario en una pasada sobre las columnas: {fecha: [tmax, tmin, vmax, dir_en_vmax, precip]}
+        days = {}
+        for i, h in enumerate(self.hours):
+            ordinal = h // 24
+            t, v = self.temp[i], self.wind_speed[i]
+            agg = days.get(ordinal)
+            if agg is None:
+                days[ordinal] = [t, t, v, self.wind_dir[i], self.precip[i]]
+                continue
+            if t > agg[0]: agg[0] = t
+            if t < agg[1]: agg[1] = t
+            if v > agg[2]: agg[2], agg[3] = v, self.wind_dir[i]
+            agg[4] += self.precip[i]
+        return {datetime.date.fromordinal(o): agg for o, agg in sorted(days.items())}
+
+class SMNIndex:
+    # Índice del producto pron5d: se construye en una sola pasada y se conserva
+    def __init__(self):
+        self.stations = {}
+
+    def __contains__(self, station_id):
+        return station_id in self.stations
+
+    def __getitem__(self, station_id):
+        return self.stations[station_id]
+
+    def __iter__(self):
+        return iter(self.stations)
+
+    @classmethod
+    def parse(cls, content):
+        if isinstance(content, str): content = content.encode('latin-1', errors='ignore')
+        index = cls()
+        current = None
+        ordinals = {}
+        for m in _SMN_TOKEN.finditer(content):
+            kind = m.lastgroup
+            if kind == 'station':
+                current = SMNStation(m.group('station').decode('ascii'), m.start())
+                index.stations.setdefault(current.station_id, current)
+                continue
+            if current is None: continue
+            if kind == 'sep':
+                current.blocks.append(m.start())
+                continue
+            day, mon, year, hour, temp, wdir, speed, precip = m.group('day', 'mon', 'year', 'hour', 'temp', 'dir', 'speed', 'precip')
+            key = (day, mon, year)
+            ordinal = ordinals.get(key)
+            if ordinal is None:
+                try: ordinal = datetime.date(int(year), _SMN_MESES[mon], int(day)).toordinal()
+                except (KeyError, ValueError): ordinal = -1
+                ordinals[key] = ordinal
+            if ordinal < 0: continue
+            current.hours.append(ordinal * 24 + int(hour))
+            current.temp.append(float(temp))
+            current.wind_dir.append(int(wdir) % 360)
+            current.wind_speed.append(float(speed))
+            current.precip.append(float(precip) if precip else 0.0)
+        return index
+
+class CachedProvider:
+    # Lo común a los proveedores: descarga vía la caché HTTP compartida (con el cortocircuito de su
+    # directorio), emisión del producto y parseo memoizado por emisión. name: clave en métricas y en el breaker
+    name = None
+    cache_ttl = 3600
+
+    def __init__(self, cache=None):
+        self.cache = cache or get_cache()
+        # Breaker del último pedido: (proveedor, host de la URL) en el registro de la caché
+        self.breaker = None
+        # time.monotonic() límite de la descarga (lo fija FusionEngine por fuente; None = sin presupuesto)
+        self.deadline = None
+        self.response = None
+        self.issuance = None
+        self.stats = None
+
+    def _issuance(self, content):
+        return None
+
+    def _fetch(self, url, kind, parse, params=None, headers=None):
+        # Descarga + parseo instrumentados; cualquier error queda en stats.error y el proveedor no aporta
         try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r') as f:
-                    data = json.load(f)
-                    # Retornamos el contenido sin importar la edad si el servidor falla
-                    return data.get('content')
+            self.stats = ProviderStats(self.name)
+            self.breaker = self.cache.circuits.breaker(self.name, url)
+            timeout = None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+            self.response = self.cache.get(url, params=params, headers=headers, ttl=self.cache_ttl, timeout=timeout,
+                                           stats=self.stats, breaker=self.breaker)
+            if not self.response: return None
+            self.issuance = self.stats.issuance = issuance_of(self.response, self._issuance)
+            return self.cache.parse(self.response, kind, parse, stats=self.stats, version=self.issuance)
+        except Exception as e:
+            print(f"Parse Error ({self.name}): {e}")
+            self.stats.error = f"parse: {e}"
             return None
-        except: return None
 
-    def _save_cache(self, content):
-        try:
-            # Solo guardamos si el contenido tiene datos de la ubicación
-            if content and self.location_id in content:
-                with open(self.cache_file, 'w') as f:
-                    json.dump({'timestamp': time.time(), 'content': content}, f)
-        except: pass
+class SMNProvider(CachedProvider):
+    name = 'smn'
+    cache_ttl = 1800
+
+    def __init__(self, location_id="CHAPELCO_AERO", cache=None):
+        super().__init__(cache)
+        self.location_id = location_id
+        self.zip_url = "https://ssl.smn.gob.ar/dpd/zipopendata.php?dato=pron5d"
+        self.index = None
+
+    def _issuance(self, content):
+        # Encabezado del .txt en el ZIP (fecha/hora de emisión + CRC): del directorio central, sin descomprimir
+        with zipfile.ZipFile(io.BytesIO(content)) as z:
+            info = next((i for i in z.infolist() if i.filename.endswith('.txt')), None)
+            return f"{datetime.datetime(*info.date_time).isoformat()}|{info.CRC:08x}" if info else None
+
+    def _unzip(self, content):
+        with zipfile.ZipFile(io.BytesIO(content)) as z:
+            txt_files = [n for n in z.namelist() if n.endswith('.txt')]
+            if not txt_files: return b""
+            with z.open(txt_files[0]) as f:
+                return f.read()
+
+    def _to_forecasts(self, station):
+        # Agregados diarios de la estación -> ForecastBatch (mismo redondeo que los demás proveedores)
+        daily = station.daily()
+        agg = np.array(list(daily.values()), dtype=float).reshape(-1, 5)
+        return ForecastBatch([date.toordinal() for date in daily], {
+            'max_temp': np.round(agg[:, 0]),
+            'min_temp': np.round(agg[:, 1]),
+            'wind_speed': np.round(agg[:, 2]),
+            'wind_dir': [deg_to_cardinal(deg) for deg in agg[:, 3].tolist()],
+            'precip': np.round(agg[:, 4], 1),
+            'sky_text': ["SMN"] * len(daily),
+        }, 'SMN')
+
+    def get_index(self):
+        # Descarga única (vía caché compartida) + parseo único; el índice queda en self.index
+        self.index = self._fetch(self.zip_url, 'smn-index', lambda content: SMNIndex.parse(self._unzip(content)))
+        return self.index
+
+    def get_forecasts(self, location_ids=None):
+        # API batch: una descarga y un parseo para N estaciones
+        index = self.get_index()
+        if not index: return {}
+        if location_ids is None: location_ids = [loc for loc in index if len(index[loc])]
+        return {loc: self._to_forecasts(index[loc]) for loc in location_ids if loc in index}
 
     def get_forecast(self):
-        content = None
-        # 1. Intento de descarga en vivo
-        try:
-            r = requests.get(self.zip_url, stream=True, timeout=15)
-            if r.status_code == 200:
-                with zipfile.ZipFile(io.BytesIO(r.content)) as z:
-                    txt_files = [n for n in z.namelist() if n.endswith('.txt')]
-                    if txt_files:
-                        with z.open(txt_files[0]) as f:
-                            raw = f.read().decode('latin-1', errors='ignore')
-                            if self.location_id in raw:
-                                content = raw
-                                self._save_cache(content) # Actualizamos backup
-        except Exception as e:
-            print(f"SMN Live Error: {e}")
+        return self.get_forecasts([self.location_id]).get(self.location_id)
 
-        # 2. Fallback automático al Backup si falla la descarga o viene vacío
-        if not content:
-            content = self._load_cache()
-        
-        if not content: return None
+    def get_station(self):
+        # Columnas trihorarias de la estación (para la grilla horaria de la fusión)
+        index = self.get_index()
+        if not index or self.location_id not in index: return None
+        return index[self.location_id]
+# Filas que debe tener la tabla del extendido AIC (por prefijo de la etiqueta de la columna 0)
+AIC_LABELS = ('cielo', 'temp', 'viento', 'dir', 'pres')
 
-        # 3. Parseo Ultra-Robusto con Regex
-        try:
-            lines = content.splitlines()
-            capture = False
-            # Detecta fechas como 28/ENE/2026
-            date_pattern = re.compile(r'(\d{1,2})/([A-Z]{3})/(\d{4})')
-            daily_agg = collections.defaultdict(lambda: {'temps': [], 'winds': []})
-            meses = {"ENE": 1, "FEB": 2, "MAR": 3, "ABR": 4, "MAY": 5, "JUN": 6, 
-                     "JUL": 7, "AGO": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DIC": 12}
-            
-            for line in lines:
-                if self.location_id in line:
-                    capture = True
-                    continue 
-                if capture:
-                    if "=====" in line and not any(m in line for m in meses):
-                        if len(daily_agg) > 0: break # Fin de la sección
-                        else: continue
-                    
-                    match = date_pattern.search(line)
-                    if match:
-                        try:
-                            # Extraer Fecha
-                            d, m_str, y = match.groups()
-                            date_obj = datetime.date(int(y), meses.get(m_str.upper(), 1), int(d))
-                            
-                            # Extraer números de la línea (Temp, Dir, Vel, Precip)
-                            # Buscamos floats o ints después de la hora (ej: 00Hs.)
-                            nums = re.findall(r"[-+]?\d*\.\d+|\d+", line.split("Hs.")[-1])
-                            
-                            if len(nums) >= 3:
-                                temp = float(nums[0])
-                                wind_speed = float(nums[2]) # El tercer número suele ser KM/H tras el pipe
-                                
-                                daily_agg[date_obj]['temps'].append(temp)
-                                daily_agg[date_obj]['winds'].append(wind_speed)
-                        except: continue
-            
-            forecasts = []
-            for date, data in sorted(daily_agg.items()):
-                if not data['temps']: continue
-                forecasts.append({
-                    'date': date,
-                    'max_temp': int(round(max(data['temps']))),
-                    'min_temp': int(round(min(data['temps']))),
-                    'wind_speed': int(round(max(data['winds']))),
-                    'wind_dir': "Var.",
-                    'sky_text': "SMN",
-                    'source': 'SMN'
-                })
-            return forecasts
-        except Exception: return None
-class AICProvider:
-    def __init__(self):
+def _clipped(crop, region, page, tol=1.0):
+    # Algún trazo del recorte llega a un borde que no es el de la página: la tabla sigue afuera de la región
+    rx0, rtop, rx1, rbottom = region
+    for e in crop.edges:
+        if ((rx0 > 0 and e['x0'] - rx0 < tol) or (rtop > 0 and e['top'] - rtop < tol) or
+                (rx1 < page.width and rx1 - e['x1'] < tol) or (rbottom < page.height and rbottom - e['bottom'] < tol)): return True
+    return False
+
+class AICProvider(CachedProvider):
+    name = 'aic'
+    cache_ttl = 3600
+    parsed_keep = 8
+
+    def __init__(self, cache=None, constrained=True):
+        super().__init__(cache)
         self.pdf_url = "https://www.aic.gob.ar/sitio/extendido-pdf?a=1029&z=1750130550"
+        # Modo acotado: solo analiza la región de la tabla (bbox aprendido del último parseo completo)
+        self.constrained = constrained
+        self.parsed_dir = os.path.join(self.cache.directory, "parsed")
+        self.layout_file = os.path.join(self.parsed_dir, "aic-layout.json")
     def _clean_int(self, text):
         if not text: return None
         matches = re.findall(r'-?\d+', text)
         if matches: return int(matches[0])
         return None
-    def get_forecast(self):
+    def _issuance(self, content):
+        # Del producto descargado, no del enlace (la URL no cambia entre publicaciones): fecha del PDF (legible)
+        # + SHA-256 del cuerpo, la misma clave que la tabla parseada en disco
+        m = _PDF_DATE.search(content)
+        digest = self.response.digest[:16]
+        return f"{m.group(1).decode()}|{digest}" if m else digest
+    def _load_parsed(self, digest):
+        # Resultado persistido por SHA-256 del PDF: sobrevive reinicios del proceso
+        try:
+            with open(os.path.join(self.parsed_dir, f"aic-{digest}.json"), 'r') as f:
+                forecasts = json.load(f)
+            for rec in forecasts: rec['date'] = datetime.date.fromisoformat(rec['date'])
+            return ForecastBatch.from_records(forecasts, 'AIC')
+        except (OSError, ValueError, KeyError, TypeError): return None
+    def _save_parsed(self, digest, forecasts):
         try:
-            response = requests.get(self.pdf_url, stream=True, timeout=10)
-            with pdfplumber.open(io.BytesIO(response.content)) as pdf:
-                page = pdf.pages[0]
-                table = max(page.extract_tables(), key=len)
-                forecasts = []
-                row_map = {}
-                for i, row in enumerate(table):
-                    if not row or not row[0]: continue
-                    label = row[0].lower()
-                    if "cielo" in label: row_map['sky'] = i
-                    elif "temp" in label: row_map['temp'] = i
-                    elif "viento" in label: row_map['wind'] = i
-                    elif "dir" in label: row_map['dir'] = i
-                    elif "pres" in label: row_map['pres'] = i
+            os.makedirs(self.parsed_dir, exist_ok=True)
+            atomic_write(os.path.join(self.parsed_dir, f"aic-{digest}.json"), json.dumps(forecasts.to_dicts(), default=json_default).encode())
+            # Conservamos solo las últimas versiones
+            old = sorted((os.path.getmtime(os.path.join(self.parsed_dir, n)), n) for n in os.listdir(self.parsed_dir)
+                         if n.startswith("aic-") and n != "aic-layout.json")
+            for _, name in old[:-self.parsed_keep]: os.unlink(os.path.join(self.parsed_dir, name))
+        except OSError as e: print(f"AIC Parsed Cache Error: {e}")
+    def _load_layout(self):
+        try:
+            with open(self.layout_file, 'r') as f: return tuple(json.load(f)['bbox'])
+        except (OSError, ValueError, KeyError): return None
+    def _save_layout(self, bbox):
+        try:
+            os.makedirs(self.parsed_dir, exist_ok=True)
+            atomic_write(self.layout_file, json.dumps({'bbox': list(bbox)}).encode())
+        except OSError: pass
+    def _table_ok(self, table):
+        # Tabla completa: fechas desde la columna 1 de la fila 0, todas las filas esperadas y pares día/noche enteros
+        if not table or not table[0] or len(table[0]) < 3 or (len(table[0]) - 1) % 2: return False
+        try: datetime.datetime.strptime(table[0][1] or "", "%d-%m-%Y")
+        except ValueError: return False
+        labels = [(row[0] or "").lower() for row in table if row]
+        if not all(any(key in label for label in labels) for key in AIC_LABELS): return False
+        return all(len(row) == len(table[0]) for row in table)
+    def _extract_table(self, page):
+        bbox = self._load_layout() if self.constrained else None
+        if bbox:
+            try:
+                # Recorte con margen sobre la región conocida de la tabla
+                x0, top, x1, bottom = bbox
+                region = (max(0, x0 - 6), max(0, top - 6), min(page.width, x1 + 6), min(page.height, bottom + 6))
+                crop = page.crop(region)
+                tables = crop.find_tables()
+                # Tabla cortada (creció o el bbox quedó corto) o sin el formato esperado: se re-aprende abajo
+                if tables and not _clipped(crop, region, page):
+                    table = max(tables, key=lambda t: len(t.rows)).extract()
+                    if self._table_ok(table): return table
+            except ValueError: pass
+        # Página completa: aprendemos el bbox de la tabla más grande para la próxima vez
+        tables = page.find_tables()
+        largest = max(tables, key=lambda t: len(t.rows))
+        table = largest.extract()
+        if not self._table_ok(table): raise ValueError("tabla AIC sin el formato esperado")
+        self._save_layout(largest.bbox)
+        return table
+    def _parse_pdf(self, content):
+        # pdfplumber (y pdfminer) se carga solo cuando el PDF no está ya parseado en disco
+        import pdfplumber
+        with pdfplumber.open(io.BytesIO(content), pages=[1]) as pdf:
+            page = pdf.pages[0]
+            table = self._extract_table(page)
+            forecasts = []
+            row_map = {}
+            for i, row in enumerate(table):
+                if not row or not row[0]: continue
+                label = row[0].lower()
+                if "cielo" in label: row_map['sky'] = i
+                elif "temp" in label: row_map['temp'] = i
+                elif "viento" in label: row_map['wind'] = i
+                elif "dir" in label: row_map['dir'] = i
+                elif "pres" in label: row_map['pres'] = i
+            
+            date_row = table[0]
+            for c in range(1, len(date_row), 2):
+                if c+1 >= len(date_row): break
+                try: date_obj = datetime.datetime.strptime(date_row[c], "%d-%m-%Y").date()
+                except: continue 
+                sky_day = table[row_map.get('sky', 2)][c]
+                max_temp = self._clean_int(table[row_map.get('temp', 3)][c])
+                min_temp = self._clean_int(table[row_map.get('temp', 3)][c+1])
+                wind_speed = self._clean_int(table[row_map.get('wind', 4)][c])
+                wind_dir = table[row_map.get('dir', 6)][c]
+                pres = self._clean_int(table[row_map.get('pres', 7)][c])
                 
-                date_row = table[0]
-                for c in range(1, len(date_row), 2):
-                    if c+1 >= len(date_row): break
-                    try: date_obj = datetime.datetime.strptime(date_row[c], "%d-%m-%Y").date()
-                    except: continue 
-                    sky_day = table[row_map.get('sky', 2)][c]
-                    max_temp = self._clean_int(table[row_map.get('temp', 3)][c])
-                    min_temp = self._clean_int(table[row_map.get('temp', 3)][c+1])
-                    wind_speed = self._clean_int(table[row_map.get('wind', 4)][c])
-                    wind_dir = table[row_map.get('dir', 6)][c]
-                    pres = self._clean_int(table[row_map.get('pres', 7)][c])
-                    
-                    forecasts.append({
-                        'date': date_obj,
-                        'max_temp': max_temp,
-                        'min_temp': min_temp,
-                        'sky_text': sky_day.replace('\n', ' '),
-                        'wind_speed': wind_speed,
-                        'wind_dir': wind_dir,
-                        'pressure': pres,
-                        'source': 'AIC'
-                    })
-                return forecasts
-        except: return None
-class OpenMeteoProvider:
-    def __init__(self, lat=-40.15, lon=-71.35):
+                forecasts.append({
+                    'date': date_obj,
+                    'max_temp': max_temp,
+                    'min_temp': min_temp,
+                    'sky_text': sky_day.replace('\n', ' '),
+                    'wind_speed': wind_speed,
+                    'wind_dir': wind_dir,
+                    'pressure': pres,
+                    'source': 'AIC'
+                })
+            return ForecastBatch.from_records(forecasts, 'AIC')
+    def _parse_cached(self, content):
+        digest = self.response.digest
+        forecasts = self._load_parsed(digest)
+        if forecasts is None:
+            forecasts = self._parse_pdf(content)
+            self._save_parsed(digest, forecasts)
+        return forecasts
+    def get_forecast(self):
+        return self._fetch(self.pdf_url, 'aic-table', self._parse_cached)
+class OpenMeteoProvider(CachedProvider):
+    name = 'om'
+    cache_ttl = 900
+
+    def __init__(self, lat=-40.15, lon=-71.35, cache=None):
+        super().__init__(cache)
         self.base_url = "https://api.open-meteo.com/v1/forecast"
         self.params = {
             "latitude": lat, "longitude": lon,
             "daily": ["wind_gusts_10m_max", "temperature_2m_max", "temperature_2m_min", "weather_code", "wind_speed_10m_max", "wind_direction_10m_dominant"],
+            "hourly": ["temperature_2m", "wind_speed_10m", "wind_gusts_10m"],
+            "forecast_days": 16,
             "timezone": "auto"
         }
+    def _issuance(self, content):
+        # La API no informa la corrida del modelo: el cuerpo sin generationtime_ms (distinto en cada
+        # pedido) solo cambia cuando se publica una corrida nueva
+        return hashlib.sha256(_OM_GENERATION.sub(b'', content)).hexdigest()[:16]
     def get_data(self):
+        return self._fetch(self.base_url, 'om-json', json.loads, params=self.params)
+class OpenMeteoEnsembleProvider(OpenMeteoProvider):
+    # Ensamble de Open-Meteo: todos los miembros horarios del modelo (decenas de miembros x horas).
+    # Se decodifica directo a matrices NumPy y solo esas matrices quedan memoizadas
+    name = 'ens'
+    cache_ttl = 3600
+
+    def __init__(self, lat=-40.15, lon=-71.35, cache=None, model="gfs_seamless", forecast_days=7):
+        super().__init__(lat, lon, cache)
+        self.base_url = "https://ensemble-api.open-meteo.com/v1/ensemble"
+        self.params = {
+            "latitude": lat, "longitude": lon,
+            "hourly": ["temperature_2m", "wind_speed_10m", "wind_gusts_10m"],
+            "models": model,
+            "forecast_days": forecast_days,
+            "timezone": "auto"
+        }
+    def _parse_members(self, content):
+        from ensemble import members_matrix
+        return members_matrix(content)
+    def get_members(self):
+        return self._fetch(self.base_url, 'ens-members', self._parse_members, params=self.params)
+class OpenMeteoGridProvider(OpenMeteoProvider):
+    # Modo grilla: todos los puntos de la cuenca en un solo pedido (listas de latitud/longitud separadas
+    # por comas); la respuesta se decodifica a un cubo puntos x horas x variables
+    name = 'grid'
+    cache_ttl = 3600
+
+    def __init__(self, points=None, cache=None, forecast_days=7):
+        from spatial import BASIN_POINTS
+        self.points = dict(points or BASIN_POINTS)
+        lat, lon = zip(*self.points.values())
+        super().__init__(cache=cache)
+        self.params = {
+            "latitude": ",".join(f"{v:.4f}" for v in lat), "longitude": ",".join(f"{v:.4f}" for v in lon),
+            "hourly": ["temperature_2m", "wind_speed_10m", "wind_gusts_10m"],
+            "forecast_days": forecast_days,
+            "timezone": "auto"
+        }
+    def _parse_grid(self, content):
+        from spatial import grid_from_response
+        return grid_from_response(json.loads(content), self.points)
+    def get_grid(self):
+        return self._fetch(self.base_url, 'grid-cube', self._parse_grid, params=self.params)
+class ObservedProvider(CachedProvider):
+    # Valores "observados" diarios para verificar pronósticos: reanálisis ERA5 de Open-Meteo
+    # (llega con ~5 días de demora, independiente de los modelos que se fusionan)
+    name = 'observed'
+    cache_ttl = 86400
+
+    def __init__(self, lat=-40.15, lon=-71.35, cache=None):
+        super().__init__(cache)
+        self.url = "https://archive-api.open-meteo.com/v1/archive"
+        self.params = {
+            "latitude": lat, "longitude": lon,
+            "daily": ["temperature_2m_max", "temperature_2m_min", "wind_speed_10m_max"],
+            "timezone": "auto"
+        }
+    def get_observed(self, start, end):
+        params = dict(self.params, start_date=start.isoformat(), end_date=end.isoformat())
+        daily = self._fetch(self.url, 'observed', lambda content: json.loads(content)['daily'], params=params)
+        if not daily: return {}
         try:
-            r = requests.get(self.base_url, params=self.params, timeout=5)
-            return r.json() if r.status_code == 200 else None
-        except: return None
-class MetNoProvider:
-    def __init__(self, lat=-40.15, lon=-71.35):
+            observed = {}
+            for i, day in enumerate(daily['time']):
+                values = {
+                    'max_temp': daily['temperature_2m_max'][i],
+                    'min_temp': daily['temperature_2m_min'][i],
+                    'wind_speed': daily['wind_speed_10m_max'][i],
+                }
+                if values['max_temp'] is None: continue
+                observed[datetime.date.fromisoformat(day)] = values
+            return observed
+        except Exception as e:
+            print(f"Observed Error: {e}")
+            return {}
+class MetNoProvider(CachedProvider):
+    name = 'metno'
+    cache_ttl = 1800
+
+    def __init__(self, lat=-40.15, lon=-71.35, cache=None, tz=LOCAL_TZ):
+        super().__init__(cache)
         self.url = "https://api.met.no/weatherapi/locationforecast/2.0/compact"
+        self.tz = tz
         self.params = {"lat": lat, "lon": lon}
         self.headers = {'User-Agent': 'WeatherAggregatorSMA/1.0 educational'}
+    def _decode(self, content, hourly=False):
+        # Una pasada sobre properties.timeseries: acumuladores diarios (máx, mín, viento máx) y, si se pide,
+        # la serie horaria en columnas prealocadas. Hora local con zoneinfo; viento en km/h
+        text = content.decode('utf-8') if isinstance(content, bytes) else content
+        days = {}
+        if hourly:
+            n = text.count('"time"')
+            hours, temps, winds = array('l', [0]) * n, array('f', [0.0]) * n, array('f', [0.0]) * n
+        k = 0
+        for item in iter_json_array(text, 'timeseries'):
+            details = item['data']['instant']['details']
+            temp = details.get('air_temperature')
+            if temp is None: continue
+            hour = local_hour(item['time'][:13], self.tz)
+            wind = details.get('wind_speed')
+            wind = wind * 3.6 if wind is not None else float('nan')
+            agg = days.get(hour // 24)
+            if agg is None: days[hour // 24] = [temp, temp, wind]
+            else:
+                if temp > agg[0]: agg[0] = temp
+                if temp < agg[1]: agg[1] = temp
+                if wind > agg[2] or agg[2] != agg[2]: agg[2] = wind
+            if hourly:
+                hours[k], temps[k], winds[k] = hour, temp, wind
+                k += 1
+        ordinals = sorted(days)
+        agg = np.array([days[o] for o in ordinals], dtype=float).reshape(-1, 3)
+        forecasts = ForecastBatch(ordinals, {'max_temp': np.round(agg[:, 0]), 'min_temp': np.round(agg[:, 1]),
+                                             'wind_speed': np.round(agg[:, 2])}, 'Met.no')
+        if not hourly: return forecasts, None
+        del hours[k:], temps[k:], winds[k:]
+        return forecasts, {'hours': hours, 'temp': temps, 'wind_speed': winds}
+    def _parse(self, content):
+        return self._decode(content)[0]
+    def _parse_hourly(self, content):
+        # Serie sub-diaria en el eje de SMNStation.hours
+        return self._decode(content, hourly=True)[1]
+    def _issuance(self, content):
+        # meta.updated_at: hora de la corrida que generó el pronóstico
+        m = _METNO_UPDATED.search(content)
+        return m.group(1).decode() if m else None
+    # Met.no exige respetar Expires / If-Modified-Since: lo resuelve la caché
     def get_forecast(self):
-        try:
-            r = requests.get(self.url, headers=self.headers, params=self.params, timeout=5)
-            if r.status_code != 200: return None
-            data = r.json()
-            daily = {}
-            for item in data['properties']['timeseries']:
-                time_str = item['time']
-                dt = datetime.datetime.fromisoformat(time_str.replace('Z', '+00:00')) - datetime.timedelta(hours=3)
-                date_key = dt.date()
-                details = item['data']['instant']['details']
-                temp = details.get('air_temperature')
-                wind = details.get('wind_speed')
-                if date_key not in daily: daily[date_key] = {'temps': [], 'winds': []}
-                if temp is not None: daily[date_key]['temps'].append(temp)
-                if wind is not None: daily[date_key]['winds'].append(wind)
-            
-            forecasts = []
-            for d, v in sorted(daily.items()):
-                if not v['temps']: continue
-                forecasts.append({
-                    'date': d,
-                    'max_temp': int(round(max(v['temps']))),
-                    'min_temp': int(round(min(v['temps']))),
-                    'wind_speed': int(round(max(v['winds']))),
-                    'source': 'Met.no'
-                })
-            return forecasts
-        except: return None
-class AccuWeatherProvider:
-    def get_forecast(self): return None
+        return self._fetch(self.url, 'metno-daily', self._parse, params=self.params, headers=self.headers)
+    def get_hourly(self):
+        return self._fetch(self.url, 'metno-hourly', self._parse_hourly, params=self.params, headers=self.headers)
@@ -0,0 +1,91 @@
+import collections
+import os
+import re
+import warnings
+import numpy as np
+from data_sources import iter_json_object
+from records import ForecastBatch
+
+# Modo ensamble (miembros de Open-Meteo): apagado por defecto, es la descarga más pesada
+ENSEMBLE = os.environ.get("CLIMA_SMA_ENSEMBLE", "0") == "1"
+# Variable del registro -> variable horaria de la API de ensambles
+ENSEMBLE_VARIABLES = {'temp': 'temperature_2m', 'wind_speed': 'wind_speed_10m', 'gusts': 'wind_gusts_10m'}
+QUANTILES = (10, 50, 90)
+# Umbrales de probabilidad de excedencia (variable diaria -> km/h)
+EXCEEDANCE = {'gusts': 60.0}
+# Arreglos del bloque "hourly": variable de control o miembro ("temperature_2m_member07") -> nombre base
+_MEMBER_KEY = re.compile(r'"(\w+?)(?:_member\d+)?"\s*:\s*\[')
+
+def members_matrix(content, variables=ENSEMBLE_VARIABLES):
+    # Cuerpo JSON del ensamble -> (horas datetime64[h], {variable: matriz miembros x horas float32}).
+    # Cada arreglo del bloque "hourly" se decodifica solo y se copia a su fila de una matriz prealocada
+    # (miembros contados antes sobre el texto): el pico es la matriz más una sola lista JSON
+    text = content.decode('utf-8') if isinstance(content, bytes) else content
+    start = text.find('"hourly"')
+    if start < 0: return None
+    counts = collections.Counter(_MEMBER_KEY.findall(text, start))
+    names = {name: var for var, name in variables.items()}
+    times, matrices, filled = None, {}, {}
+    for key, values in iter_json_object(text, 'hourly'):
+        if key == 'time':
+            times = np.array(values, dtype='datetime64[h]')
+            continue
+        var = names.get(key.split('_member')[0])
+        if var is None: continue
+        if var not in matrices:
+            matrices[var] = np.empty((counts[variables[var]], len(values)), dtype=np.float32)
+            filled[var] = 0
+        matrices[var][filled[var]] = np.array(values, dtype=float)
+        filled[var] += 1
+    if times is None: return None
+    return times, {var: matrix[:filled[var]] for var, matrix in matrices.items()}
+
+def _aligned(hours, matrix, start, length):
+    # Miembros x horas -> miembros x [start, start + length) con NaN donde no hay paso
+    grid = np.full((matrix.shape[0], length), np.nan, dtype=np.float32)
+    idx = np.asarray(hours) - start
+    ok = (idx >= 0) & (idx < length)
+    grid[:, idx[ok]] = matrix[:, ok]
+    return grid
+
+def daily_members(hours, matrices):
+    # Agregado diario por miembro sobre los días calendario que cubre el ensamble:
+    # (primer ordinal, {variable diaria: matriz miembros x días})
+    hours = np.asarray(hours)
+    start = int(hours.min()) // 24 * 24
+    days = (int(hours.max()) - start) // 24 + 1
+    blocks = {var: _aligned(hours, m, start, days * 24).reshape(m.shape[0], days, 24) for var, m in matrices.items()}
+    daily = {}
+    if 'temp' in blocks:
+        daily['max_temp'] = np.fmax.reduce(blocks['temp'], axis=2)
+        daily['min_temp'] = np.fmin.reduce(blocks['temp'], axis=2)
+    if 'wind_speed' in blocks: daily['wind_speed'] = np.fmax.reduce(blocks['wind_speed'], axis=2)
+    if 'gusts' in blocks: daily['gusts'] = np.fmax.reduce(blocks['gusts'], axis=2)
+    return start // 24, daily
+
+def member_stats(daily, quantiles=QUANTILES, exceedance=EXCEEDANCE):
+    # Sobre el eje de miembros, todo vectorizado: percentiles, dispersión (desvío) y probabilidad de
+    # superar cada umbral (fracción de miembros con dato). Días sin miembros quedan en NaN
+    stats = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for var, x in daily.items():
+            valid = (~np.isnan(x)).sum(axis=0)
+            for q, values in zip(quantiles, np.nanpercentile(x, quantiles, axis=0)):
+                stats[f"{var}_p{q}"] = values
+            stats[f"{var}_spread"] = np.nanstd(x, axis=0)
+            if var in exceedance:
+                hits = (x > exceedance[var]).sum(axis=0)
+                stats[f"p_{var}_{int(exceedance[var])}"] = np.where(valid > 0, hits / np.maximum(valid, 1), np.nan)
+    return stats
+
+def ensemble_records(hours, matrices, source='Ensamble'):
+    # Un registro por día calendario con las estadísticas del ensamble (se redondean como los demás registros):
+    # las columnas de member_stats pasan directo al lote
+    if not matrices: return None
+    first, daily = daily_members(hours, matrices)
+    members = max(m.shape[0] for m in matrices.values())
+    columns = {name: np.round(values.astype(float), 2 if name.startswith("p_") else 1) for name, values in member_stats(daily).items()}
+    days = next(iter(daily.values())).shape[1]
+    columns['members'] = np.full(days, members)
+    return ForecastBatch(np.arange(first, first + days), columns, source)
@@ -1,78 +1,306 @@
 import pandas as pd
+import numpy as np
 import datetime
-from data_sources import SMNProvider, AICProvider, OpenMeteoProvider, AccuWeatherProvider, MetNoProvider
+import concurrent.futures
+import hashlib
+import time
+from metrics import ProviderStats, RefreshMetrics, REGISTRY
+from skill import SkillTracker
+from http_cache import HTTPCache
+from providers import PROVIDERS, HOURLY
+from records import ForecastBatch, as_batch
+
+# Variables fusionadas (última dimensión de los bloques de valores)
+VARIABLES = ['max_temp', 'min_temp', 'wind_speed']
+# La fuente declarada como base (Open-Meteo) lleva el 40%, el resto comparte el 60%
+OM_WEIGHT = 0.4
+# Grilla horaria: variables por hora (la aportan las fuentes con serie sub-diaria)
+HOURLY_VARIABLES = list(HOURLY)
+# Huecos mayores entre muestras no se interpolan (Met.no pasa a 6 h, SMN es trihorario)
+MAX_GAP_H = 6
+# Campos descriptivos del resumen: campo del registro -> (clave en el día, valor por defecto)
+DESCRIPTIVE_FIELDS = {'sky_text': ('sky_desc', "Desconocido"), 'wind_dir': ('wind_dir', "-"),
+                      'pressure': ('pressure', "-"), 'gusts': ('gusts', None)}
+# Campos del resumen que acepta get_forecast(variables=...) -> campo de los registros de los proveedores
+SUMMARY_FIELDS = {**{name: name for name in VARIABLES}, **{name: field for field, (name, _) in DESCRIPTIVE_FIELDS.items()}}
+DAY_NAMES = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+def records_frame(records):
+    # Registros diarios (ForecastBatch o lista de dicts) -> DataFrame indexado por fecha (la primera aparición
+    # gana); las columnas del lote entran tal cual
+    batch = as_batch(records)
+    if not batch: return None
+    frame = pd.DataFrame({name: batch.column(name) for name in VARIABLES}, index=pd.Index(batch.dates()))
+    return frame[~frame.index.duplicated()]
+
+def to_grid(hours, columns, start, length, max_gap=MAX_GAP_H):
+    # Serie irregular -> bloque (horas, HOURLY_VARIABLES) sobre la grilla [start, start + length):
+    # interpolación lineal, NaN fuera del rango de la serie o dentro de huecos > max_gap
+    grid = np.full((length, len(HOURLY_VARIABLES)), np.nan)
+    x = np.asarray(hours, dtype=float)
+    if not len(x): return grid
+    order = np.argsort(x, kind='stable')
+    x = x[order]
+    t = np.arange(start, start + length, dtype=float)
+    after = np.clip(np.searchsorted(x, t), 0, len(x) - 1)
+    before = np.clip(after - 1, 0, len(x) - 1)
+    covered = (t >= x[0]) & (t <= x[-1]) & ((x[after] == t) | (x[after] - x[before] <= max_gap))
+    for v, name in enumerate(HOURLY_VARIABLES):
+        if columns.get(name) is None: continue
+        y = np.asarray(columns[name], dtype=float)[order]
+        ok = ~np.isnan(y)
+        if not ok.any(): continue
+        grid[:, v] = np.where(covered, np.interp(t, x[ok], y[ok]), np.nan)
+    return grid
+
+def daily_from_grid(grid, days):
+    # (fuentes, días*24, HOURLY_VARIABLES) -> (fuentes, días, VARIABLES): máx/mín de temperatura y viento máximo.
+    # fmax/fmin ignoran las horas sin dato; un día sin ninguna queda en NaN
+    blocks = grid[:, :days * 24].reshape(grid.shape[0], days, 24, grid.shape[-1])
+    daily = np.stack([
+        np.fmax.reduce(blocks[..., 0], axis=2),
+        np.fmin.reduce(blocks[..., 0], axis=2),
+        np.fmax.reduce(blocks[..., 1], axis=2),
+    ], axis=-1)
+    # Mismo redondeo que los registros diarios de cada proveedor
+    return np.round(daily)
+
+def weighted_fusion(values, present, base=0, base_weight=OM_WEIGHT, factor=None, bias=None, per_variable=False):
+    # values: (fuentes, ..., variables); present: (fuentes, ...). Cualquier forma intermedia
+    # (días, o ubicaciones x días) se fusiona en una sola operación vectorizada.
+    # factor/bias: (fuentes, ..., variables) de SkillTracker.adjustments; escalan el split fijo
+    # y corrigen el sesgo de cada fuente. Sin historia (1 y 0) queda el 40/60 original.
+    # base=None: ninguna fuente base, todas las presentes pesan igual
+    if base is None:
+        weights = present / np.maximum(present.sum(axis=0), 1)
+    else:
+        others = present.copy()
+        others[base] = False
+        n_others = others.sum(axis=0)
+        weights = np.where(others, (1.0 - base_weight) / np.maximum(n_others, 1), 0.0)
+        # Si solo está la base, se le asigna el 100%
+        weights[base] = np.where(present[base], np.where(n_others > 0, base_weight, 1.0), 0.0)
+    if per_variable:
+        # Grilla horaria: cada variable se pondera solo entre las fuentes que la tienen
+        effective = np.where(present[..., None] & ~np.isnan(values), weights[..., None], 0.0)
+    else:
+        # Solo cuentan las fuentes con máxima y mínima; el viento faltante cuenta como 0
+        valid = present & ~np.isnan(values[..., 0]) & ~np.isnan(values[..., 1])
+        effective = np.where(valid, weights, 0.0)[..., None]
+    if factor is not None: effective = effective * factor
+    if bias is not None: values = values - bias
+    total = effective.sum(axis=0)
+    fused = (effective * np.nan_to_num(values)).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fused = fused / total
+    return fused, total[..., 0], weights
 
 class FusionEngine:
-    def __init__(self):
-        self.smn = SMNProvider()
-        self.aic = AICProvider()
-        self.om = OpenMeteoProvider()
-        self.metno = MetNoProvider() 
-        self.aw = AccuWeatherProvider()
+    def __init__(self, deadline=12.0, cache=None, skill=None, client=None, providers=None, extras=None):
+        # cache: HTTPCache compartida por los proveedores (None = la caché global del proceso)
+        # client: http_client.HTTPClient para una caché propia (None = el pool global del proceso)
+        if cache is None and client is not None: cache = HTTPCache(client=client)
+        # skill: SkillTracker con el error histórico por fuente (None = el del archivo por defecto, False = split fijo)
+        self.skill = SkillTracker() if skill is None else skill
+        # providers: claves o ProviderSpec a usar (None = todo el registro, en orden de registro)
+        self.specs = [PROVIDERS[p] if isinstance(p, str) else p for p in (providers or PROVIDERS)]
+        self.providers = {spec.key: spec.build(cache) for spec in self.specs}
+        # extras: nombres de extras a activar ('ensemble', 'grid'); None = el opt-in de cada spec (CLIMA_SMA_*).
+        # Las fuentes sin extras siempre están activas
+        self.enabled = {spec.key for spec in self.specs
+                        if not spec.extras or (spec.enabled if extras is None else not set(spec.extras).isdisjoint(extras))}
+        # Extras del último get_forecast que no van por día (p. ej. el cubo espacial 'grid')
+        self.extras = {}
+        # Deadline global (segundos) para toda la etapa de descarga
+        self.deadline = deadline
+        self.dropped = []
+        self.stale = {}
+        self.circuits = {}
+        self.metrics = None
+        # Grilla horaria del último get_forecast: {'time', 'sources', 'variables', 'values', 'fused'}
+        self.hourly = None
+        # Insumos de la última fusión (emisión de cada producto, fecha, skill) y si se reutilizó
+        self.inputs = None
+        self.reused = False
+        # (insumos, pronóstico, grilla) de la última fusión: el motor fusiona una ubicación y solo
+        # recalcula cuando cambió algún insumo
+        self._last = None
 
-    def get_5_day_forecast(self):
-        # 1. Initialize target dates (Today + 4 days)
-        today = datetime.date.today()
-        target_dates = [today + datetime.timedelta(days=i) for i in range(5)]
-        
-        # 2. Fetch Data
-        aic_data = self.aic.get_forecast() 
-        smn_data = self.smn.get_forecast()
-        om_data = self.om.get_data()
-        metno_data = self.metno.get_forecast()
-        aw_data = self.aw.get_forecast()
-        
-        # 3. Build Base DataFrame
-        final_forecast = []
+    def remember(self, inputs, forecast, hourly):
+        # Fusión ya calculada (p. ej. el snapshot en disco) para no recalcularla tras un reinicio
+        self._last = (inputs, forecast, hourly) if inputs else None
+
+    def _fetch_all(self, specs, refresh=None):
+        # Descarga concurrente: la latencia es la del proveedor más lento que llega a tiempo.
+        # Los más caros se lanzan primero; cada uno tiene su timeout, acotado por el deadline global
+        specs = sorted(specs, key=lambda spec: -spec.cost)
+        results = {spec.key: None for spec in specs}
+        durations = {}
+        def timed(name, fn):
+            start = time.perf_counter()
+            try: return fn()
+            finally: durations[name] = time.perf_counter() - start
+        self.dropped = []
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(len(specs), 1))
+        start = time.monotonic()
+        # El límite de cada fuente baja al proveedor (y al cliente HTTP): un descartado deja de reintentar
+        # al vencer su presupuesto y su hilo no demora la salida del proceso
+        for spec in specs: self.providers[spec.key].deadline = start + min(self.deadline, spec.timeout)
+        futures = {pool.submit(timed, spec.key, getattr(self.providers[spec.key], spec.fetch)): spec for spec in specs}
+        expires = {fut: self.providers[spec.key].deadline for fut, spec in futures.items()}
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            # Los que no llegaron a su límite se descartan; sus hilos terminan solos con su propio timeout
+            for fut in [f for f in pending if expires[f] <= now]:
+                pending.discard(fut)
+                spec = futures[fut]
+                self.dropped.append(spec.key)
+                if refresh:
+                    stats = ProviderStats(spec.key)
+                    stats.error = f"deadline {min(self.deadline, spec.timeout)} s"
+                    stats.total_s = now - start
+                    refresh.providers[spec.key] = stats
+            if not pending: break
+            done, pending = concurrent.futures.wait(pending, timeout=min(expires[f] for f in pending) - now,
+                                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            for fut in done:
+                spec = futures[fut]
+                provider = self.providers[spec.key]
+                stats = getattr(provider, 'stats', None) or ProviderStats(spec.key)
+                try: results[spec.key] = spec.adapt(provider, fut.result())
+                except Exception as e:
+                    print(f"Fetch Error ({spec.key}): {e}")
+                    stats.error = str(e)
+                stats.total_s = durations.get(spec.key)
+                if refresh: refresh.providers[spec.key] = stats
+        pool.shutdown(wait=False, cancel_futures=True)
+        # Copias vencidas servidas por la caché cuando el servidor falló: {fuente: edad en segundos}
+        self.stale = {}
+        self.circuits = {}
+        for spec in specs:
+            provider = self.providers[spec.key]
+            resp = getattr(provider, 'response', None)
+            if spec.key not in self.dropped and resp is not None and resp.stale:
+                self.stale[spec.key] = int(resp.age)
+            # Circuitos abiertos: {fuente: segundos hasta la próxima sonda}
+            breaker = getattr(provider, 'breaker', None)
+            if breaker and not breaker.allow(): self.circuits[spec.key] = int(breaker.retry_in())
+        return results
+
+    def get_5_day_forecast(self, today=None):
+        return self.get_forecast(days=5, today=today)
+
+    def get_forecast(self, days=5, today=None, variables=None):
+        # 1. Fechas objetivo (hoy + days-1); solo las fuentes que aportan alguna variable pedida.
+        # variables: campos del resumen a fusionar / completar ('max_temp', 'sky_desc', ... de SUMMARY_FIELDS;
+        # None = todos). Un nombre desconocido es un ValueError
+        unknown = [name for name in variables or () if name not in SUMMARY_FIELDS]
+        if unknown: raise ValueError(f"variables desconocidas: {', '.join(map(str, unknown))} (válidas: {', '.join(SUMMARY_FIELDS)})")
+        today = today or datetime.date.today()
+        target_dates = [today + datetime.timedelta(days=i) for i in range(days)]
+        target = pd.Index(target_dates)
+        requested = {SUMMARY_FIELDS[name] for name in variables} if variables else set(VARIABLES) | set(DESCRIPTIVE_FIELDS)
+        specs = [spec for spec in self.specs if spec.key in self.enabled and (spec.supplies(requested) or spec.extras)]
+        keys = [spec.key for spec in specs]
+        # Sin fuente base entre las elegidas, todas pesan igual
+        base = next((p for p, spec in enumerate(specs) if spec.base), None)
         
-        # Helper robusto para encontrar fecha (compara strings ISO para evitar errores de tipo)
-        def find_by_date(date, data):
-            if not data: return None
-            target_str = date.isoformat() if hasattr(date, 'isoformat') else str(date)
-            for d in data:
-                d_date = d.get('date')
-                if not d_date: continue
-                # Convertimos la fecha del registro a string ISO para comparar
-                current_str = d_date.isoformat() if hasattr(d_date, 'isoformat') else str(d_date)
-                if current_str == target_str: 
-                    return d
-            return None
+        # 2. Fetch Data (en paralelo, con deadline), instrumentado por proveedor; cada adaptador
+        # devuelve {'hourly': serie | None, 'daily': registros | None}
+        refresh = RefreshMetrics()
+        start = time.perf_counter()
+        contributions = self._fetch_all(specs, refresh)
+        fusion_start = time.perf_counter()
+        refresh.fetch_s = fusion_start - start
+        # Extras de los adaptadores: un lote por fecha acompaña a cada día; el resto se publica en self.extras
+        extras = {}
+        for key in keys: extras.update((contributions[key] or {}).get('extras') or {})
+        daily_extras = {name: value for name, value in extras.items() if isinstance(value, ForecastBatch)}
+        self.extras = {name: value for name, value in extras.items() if name not in daily_extras}
 
-        # Helper to find date in Open-Meteo
-        def find_in_om(date, data):
-            if not data or 'daily' not in data: return None
-            daily = data['daily']
-            times = daily.get('time', [])
-            date_str = date.isoformat()
-            try:
-                idx = times.index(date_str)
-                return {
-                    'max_temp': round(daily['temperature_2m_max'][idx]),
-                    'min_temp': round(daily['temperature_2m_min'][idx]),
-                    'gusts': round(daily['wind_gusts_10m_max'][idx]),
-                    'code': daily['weather_code'][idx],
-                    'wind_speed': round(daily['wind_speed_10m_max'][idx]),
-                    'wind_dir_deg': daily['wind_direction_10m_dominant'][idx]
-                }
-            except (ValueError, KeyError): return None
+        # Emisión de cada insumo (None = no llegó): si ninguna cambió, la fusión anterior sigue valiendo
+        # y solo se actualizan las anotaciones de descartes / copias vencidas / circuitos
+        factor, bias = self.skill.adjustments(keys, range(days), VARIABLES) if self.skill else (None, None)
+        self.inputs = {
+            'today': today.isoformat(),
+            'days': days,
+            'variables': sorted(requested),
+            'providers': {key: getattr(self.providers[key], 'issuance', None) if contributions[key] else None for key in keys},
+            'skill': hashlib.sha256(factor.tobytes() + bias.tobytes()).hexdigest()[:16] if self.skill else None,
+        }
+        self.reused = self._last is not None and self._last[0] == self.inputs
+        if self.reused:
+            _, forecast, self.hourly = self._last
+            final_forecast = [dict(day, dropped=list(self.dropped), stale=dict(self.stale), circuits=dict(self.circuits)) for day in forecast]
+            return self._finish(final_forecast, refresh, start, fusion_start)
 
-        wmo_codes = {
-            0: "Despejado", 1: "Mayormente Despejado", 2: "Parcialmente Nublado", 3: "Nublado",
-            45: "Niebla", 48: "Niebla", 51: "Llovizna", 53: "Llovizna", 55: "Llovizna",
-            61: "Lluvias", 63: "Lluvias", 65: "Lluvias Fuertes",
-            80: "Chubascos", 81: "Chubascos", 82: "Chubascos",
-            95: "Tormenta", 96: "Tormenta Granizo", 99: "Tormenta Granizo"
+        # 3. Grilla horaria común (hora local desde hoy 00 h): una fila contigua por fuente con serie
+        # (una fila por fuente con variables horarias y resolución nativa interpolable, aunque esta vez no
+        # haya llegado); después de su horizonte la fila queda sin dato
+        start_hour = today.toordinal() * 24
+        hourly_rows = [p for p, spec in enumerate(specs) if spec.resolution_h <= MAX_GAP_H and spec.supplies(HOURLY_VARIABLES)]
+        has_series = {p for p in hourly_rows if (contributions[keys[p]] or {}).get('hourly')}
+        grid = np.full((len(hourly_rows), days * 24, len(HOURLY_VARIABLES)), np.nan)
+        for i, p in enumerate(hourly_rows):
+            if p in has_series:
+                grid[i] = to_grid(*contributions[keys[p]]['hourly'], start_hour, days * 24)
+                grid[i, specs[p].horizon_days * 24:] = np.nan
+        # Sin fuente base con serie horaria, todas pesan igual
+        hourly_base = hourly_rows.index(base) if base in hourly_rows else None
+        fused_hourly, _, _ = weighted_fusion(grid, ~np.isnan(grid[..., 0]), base=hourly_base, per_variable=True)
+        grid_daily = daily_from_grid(grid, days)
+        self.hourly = {
+            'time': np.datetime64(today, 'h') + np.arange(days * 24),
+            'sources': [specs[p].label for p in hourly_rows],
+            'variables': list(HOURLY_VARIABLES),
+            'values': grid,
+            'fused': fused_hourly,
         }
+
+        # 4. Bloques diarios alineados por fecha: con serie horaria salen de la grilla;
+        # sin ella (AIC día/noche) de los registros diarios
+        # Registros por fuente: los diarios o, si no tiene, el lote por fecha que publica como extra
+        batches = {}
+        for key in keys:
+            contribution = contributions[key] or {}
+            batches[key] = as_batch(contribution.get('daily'))
+            if batches[key] is None:
+                batches[key] = next((v for v in (contribution.get('extras') or {}).values() if isinstance(v, ForecastBatch)), None)
+        # Al detalle por día van las fuentes con variables diarias (aunque no hayan llegado) y las que trajeron registros
+        audited = {key for spec, key in zip(specs, keys) if spec.variables or batches[key] is not None}
+        values = np.full((len(specs), days, len(VARIABLES)), np.nan)
+        present = np.zeros((len(specs), days), dtype=bool)
+        for p, key in enumerate(keys):
+            if p in has_series:
+                values[p] = grid_daily[hourly_rows.index(p)]
+                present[p] = ~np.isnan(values[p, :, 0])
+                continue
+            # Las fuentes sin variables fusionadas (ensamble) solo acompañan al resumen
+            if not specs[p].supplies(VARIABLES): continue
+            frame = records_frame(batches[key])
+            if frame is None: continue
+            present[p] = target.isin(frame.index)
+            present[p, specs[p].horizon_days:] = False
+            values[p] = frame.reindex(target)[VARIABLES].to_numpy(dtype=float)
+        fused, total, _ = weighted_fusion(values, present, base=base, factor=factor, bias=bias)
         
-        def deg_to_cardinal(deg):
-            dirs = ["N", "NE", "E", "SE", "S", "SO", "O", "NO"]
-            idx = round(deg / 45) % 8
-            return dirs[idx]
+        # Registros de auditoría con serie horaria: el lote de la fuente alineado a las fechas objetivo, con las
+        # columnas fusionadas reemplazadas por las de la grilla (vistas sobre values, sin copiar)
+        ordinals = [date.toordinal() for date in target_dates]
+        aligned = {}
+        for p in has_series:
+            batch = batches[keys[p]] or ForecastBatch([], {}, specs[p].label)
+            aligned[keys[p]] = batch.align(ordinals).with_columns(**{name: values[p, :, v] for v, name in enumerate(VARIABLES)})
+        # Fuentes que declaran cada campo descriptivo, de la preferida a la última
+        by_priority = sorted(specs, key=lambda spec: spec.priority)
+        describers = {field: [spec.key for spec in by_priority if field in spec.variables] for field in DESCRIPTIVE_FIELDS}
 
-        for date in target_dates:
+        final_forecast = []
+        for d, date in enumerate(target_dates):
             day_summary = {
                 'date': date,
-                'date_str': date.strftime("%A %d").title().replace("Sunday", "Domingo").replace("Monday", "Lunes").replace("Tuesday", "Martes").replace("Wednesday", "Miércoles").replace("Thursday", "Jueves").replace("Friday", "Viernes").replace("Saturday", "Sábado"),
+                'date_str': f"{DAY_NAMES[date.weekday()]} {date.day:02d}",
                 'sky_desc': "Desconocido",
                 'max_temp': None,
                 'min_temp': None,
@@ -83,79 +311,48 @@ class FusionEngine:
                 'source': 'Fusion'
             }
             
-            aic_record = find_by_date(date, aic_data)
-            smn_record = find_by_date(date, smn_data)
-            metno_record = find_by_date(date, metno_data)
-            om_record = find_in_om(date, om_data)
-            aw_record = find_by_date(date, aw_data)
-            
-            val_sources = []
-            
-            # 1. Prioridad Open-Meteo (Base 40%)
-            if om_record:
-                val_sources.append({'src': 'OM', 'max': om_record['max_temp'], 'min': om_record['min_temp'], 'wind': om_record['wind_speed'], 'weight': 0.4})
-            
-            # Otras fuentes comparten el 60% restante
-            others = [
-                ('AIC', aic_record),
-                ('SMN', smn_record),
-                ('Met.no', metno_record),
-                ('AccuWeather', aw_record)
-            ]
-            
-            active_others = [name for name, rec in others if rec]
+            # Registro por fuente para auditoría (ForecastRecord): con serie horaria, los valores que entraron a la fusión
+            records = {}
+            for p, key in enumerate(keys):
+                if key not in audited: continue
+                if key in aligned and present[p, d]: records[key] = aligned[key][d]
+                # Más allá del horizonte declarado la fuente tampoco describe el día
+                else: records[key] = batches[key].at(date) if batches[key] and d < specs[p].horizon_days else None
             
-            for name, rec in others:
-                if rec:
-                    # Inicializamos con peso 0, se distribuye abajo
-                    val_sources.append({'src': name, 'max': rec.get('max_temp'), 'min': rec.get('min_temp'), 'wind': rec.get('wind_speed'), 'weight': 0.0})
+            if total[d] > 0:
+                for v, name in enumerate(VARIABLES):
+                    if name in requested: day_summary[name] = int(round(fused[d, v]))
             
-            # Distribución dinámica de pesos
-            non_om_sources = [x for x in val_sources if x['src'] != 'OM']
-            if non_om_sources:
-                share = 0.6 / len(non_om_sources)
-                for x in non_om_sources: x['weight'] = share
-            elif val_sources:
-                # Si solo hay OM, se le asigna el 100%
-                val_sources[0]['weight'] = 1.0
-
-            # Cálculo de promedios ponderados
-            w_max, w_min, w_wind, total_w = 0, 0, 0, 0
-            for item in val_sources:
-                if item['max'] is not None and item['min'] is not None:
-                    w_max += item['max'] * item['weight']
-                    w_min += item['min'] * item['weight']
-                    w_wind += (item['wind'] or 0) * item['weight']
-                    total_w += item['weight']
-            
-            if total_w > 0:
-                day_summary['max_temp'] = int(round(w_max / total_w))
-                day_summary['min_temp'] = int(round(w_min / total_w))
-                day_summary['wind_speed'] = int(round(w_wind / total_w))
-            
-            # Prioridad para descripción de cielo y dirección de viento
-            if aic_record:
-                day_summary['sky_desc'] = aic_record.get('sky_text', "Variable")
-                day_summary['wind_dir'] = aic_record.get('wind_dir', "-")
-                day_summary['pressure'] = f"{aic_record['pressure']} hPa" if aic_record.get('pressure') else "-"
-            elif om_record:
-                day_summary['sky_desc'] = wmo_codes.get(om_record['code'], "Variable")
-                day_summary['wind_dir'] = deg_to_cardinal(om_record['wind_dir_deg'])
+            # Campos descriptivos: de la fuente preferida que los tenga ese día (AIC, luego Open-Meteo...)
+            for field, (name, default) in DESCRIPTIVE_FIELDS.items():
+                if field not in requested: continue
+                for key in describers[field]:
+                    value = (records[key] or {}).get(field)
+                    if value in (None, ""): continue
+                    day_summary[name] = f"{value} hPa" if field == 'pressure' else value
+                    break
             
-            if om_record:
-                day_summary['gusts'] = om_record['gusts']
+            # Extras por fecha (p. ej. percentiles y probabilidades del ensamble)
+            for name, batch in daily_extras.items(): day_summary[name] = batch.at(date)
             
-            srcs = [x['src'] for x in val_sources]
+            srcs = [specs[p].label for p in range(len(specs)) if present[p, d]]
             day_summary['source'] = f"Fusion ({', '.join(srcs)})"
+            # Proveedores descartados por superar el deadline
+            day_summary['dropped'] = list(self.dropped)
+            day_summary['stale'] = dict(self.stale)
+            day_summary['circuits'] = dict(self.circuits)
             
-            # Debug Info
-            day_summary['debug'] = {
-    'aic': aic_record,
-    'om': om_record,
-    'smn': smn_record,
-    'aw': metno_record, # Volvemos a usar 'aw' como nombre para que app.py no de error
-    'metno': metno_record 
-}
+            # Debug Info: registro crudo por clave de proveedor
+            day_summary['debug'] = records
             final_forecast.append(day_summary)
-            
+        
+        self._last = (self.inputs, final_forecast, self.hourly)
+        return self._finish(final_forecast, refresh, start, fusion_start)
+
+    def _finish(self, final_forecast, refresh, start, fusion_start):
+        end = time.perf_counter()
+        refresh.fusion_s = end - fusion_start
+        refresh.total_s = end - start
+        self.metrics = refresh
+        REGISTRY.record(refresh)
         return final_forecast
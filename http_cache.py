@@ -0,0 +1,258 @@
+import collections
+import email.utils
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+try: import fcntl
+except ImportError: fcntl = None   # sin flock (Windows): el lock solo coordina hilos del proceso
+
+CACHE_DIR = os.environ.get("CLIMA_SMA_CACHE_DIR", ".http_cache")
+MAX_BYTES = 64 * 1024 * 1024
+
+def atomic_write(path, data):
+    # Escritura atómica: archivo temporal en el mismo directorio + os.replace
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
+
+class FileLock:
+    # Lock exclusivo entre procesos (flock sobre un archivo) y entre hilos: cada acquire abre su propio
+    # descriptor. Si el dueño muere el sistema libera el lock, no quedan leases colgados.
+    _local = {}
+    _local_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        with self._local_lock:
+            self._thread_lock = self._local.setdefault(os.path.abspath(path), threading.Lock())
+
+    def acquire(self, timeout=None, poll=0.05):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self._thread_lock.acquire(timeout=-1 if timeout is None else timeout): return False
+        if fcntl is None: return True
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._fd = fd
+                return True
+            except BlockingIOError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    os.close(fd)
+                    self._thread_lock.release()
+                    return False
+                time.sleep(poll)
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+def _http_date(value):
+    if not value: return None
+    try: return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError): return None
+
+class CachedResponse:
+    def __init__(self, key, content, digest, age, from_cache, stale=False, not_modified=False, error=None):
+        self.key = key
+        self.content = content
+        self.digest = digest              # sha256 del cuerpo, identifica la versión
+        self.age = age                    # segundos desde la última validación con el servidor
+        self.from_cache = from_cache
+        self.stale = stale                # servido vencido porque el servidor falló
+        self.not_modified = not_modified  # revalidado con 304
+        self.error = error
+
+    def json(self):
+        return json.loads(self.content)
+
+class HTTPCache:
+    # Caché de respuestas en disco compartida por todos los proveedores:
+    # TTL por proveedor, revalidación condicional (ETag / Last-Modified / Expires),
+    # desalojo LRU por tamaño y escrituras atómicas.
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES, memo_size=32, client=None, circuits=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # http_client.HTTPClient con pool compartido (None = el cliente global del proceso).
+        # Import diferido: quien solo usa CACHE_DIR / atomic_write no carga httpx
+        if client is None:
+            from http_client import get_client
+            client = get_client()
+        self.client = client
+        # circuit.CircuitRegistry de los proveedores que usan esta caché (None = el del mismo directorio)
+        if circuits is None:
+            from circuit import get_registry
+            circuits = get_registry(directory)
+        self.circuits = circuits
+        self._lock = threading.Lock()
+        # Resultados ya parseados por (tipo, digest): un 304 no vuelve a parsear
+        self._memo = collections.OrderedDict()
+        self._memo_size = memo_size
+        os.makedirs(directory, exist_ok=True)
+
+    def _key(self, url, params):
+        raw = url + "?" + json.dumps(params or {}, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + ".body", base + ".meta"
+
+    def _read(self, key):
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r') as f: meta = json.load(f)
+            with open(body_path, 'rb') as f: content = f.read()
+        except (OSError, ValueError): return None, None
+        return meta, content
+
+    def _store(self, key, content, meta):
+        body_path, meta_path = self._paths(key)
+        atomic_write(body_path, content)
+        atomic_write(meta_path, json.dumps(meta).encode())
+        self._evict()
+
+    def _touch(self, key):
+        # mtime del cuerpo = último acceso (orden LRU)
+        try: os.utime(self._paths(key)[0])
+        except OSError: pass
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".body"): continue
+                try: st = os.stat(os.path.join(self.directory, name))
+                except OSError: continue
+                entries.append((st.st_mtime, st.st_size, name[:-5]))
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in sorted(entries):
+                if total <= self.max_bytes: break
+                for path in self._paths(key):
+                    try: os.unlink(path)
+                    except OSError: pass
+                total -= size
+
+    def _meta_from(self, headers, content, validated_at, previous=None):
+        previous = previous or {}
+        return {
+            'etag': headers.get('ETag', previous.get('etag')),
+            'last_modified': headers.get('Last-Modified', previous.get('last_modified')),
+            'expires': _http_date(headers.get('Expires')),
+            'validated_at': validated_at,
+            'digest': hashlib.sha256(content).hexdigest() if content is not None else previous.get('digest'),
+        }
+
+    def get(self, url, params=None, headers=None, ttl=3600, timeout=None, stats=None, breaker=None):
+        # stats (metrics.ProviderStats, opcional) recibe tiempos, bytes y resultado de caché
+        # timeout: presupuesto en segundos del pedido con sus reintentos (None = los del cliente)
+        # breaker (circuit.CircuitBreaker, opcional): abierto, no se toca la red
+        key = self._key(url, params)
+        meta, content = self._read(key)
+        now = time.time()
+        if meta:
+            age = now - meta['validated_at']
+            # Fresco hasta el TTL propio o hasta Expires (Met.no exige no pedir antes de Expires)
+            fresh_until = max(meta['validated_at'] + ttl, meta.get('expires') or 0)
+            if now < fresh_until:
+                self._touch(key)
+                if stats: stats.cache = 'hit'
+                return CachedResponse(key, content, meta['digest'], age, from_cache=True)
+
+        if breaker and not breaker.allow():
+            # Circuito abierto: sin esperar timeouts; una sola sonda en segundo plano por cooldown
+            if breaker.claim_probe():
+                threading.Thread(target=self._fetch, args=(key, url, params, headers, timeout, None, breaker),
+                                 name=f"probe-{breaker.name}", daemon=True).start()
+            error = f"circuit open ({breaker.name})"
+        else:
+            response, error = self._fetch(key, url, params, headers, timeout, stats, breaker, meta, content)
+            if response: return response
+
+        if stats: stats.error = error
+        # Servidor caído: servimos la copia vencida con su edad explícita
+        if meta:
+            if stats: stats.cache = 'stale'
+            print(f"Cache: sirviendo copia vencida de {url} ({int(now - meta['validated_at'])} s): {error}")
+            return CachedResponse(key, content, meta['digest'], now - meta['validated_at'], from_cache=True, stale=True, error=error)
+        print(f"Cache: sin datos para {url}: {error}")
+        return None
+
+    def _fetch(self, key, url, params, headers, timeout, stats, breaker, meta=None, content=None):
+        # Pedido condicional al servidor -> (CachedResponse, None) o (None, error); informa al breaker
+        if meta is None: meta, content = self._read(key)
+        now = time.time()
+        request_headers = dict(headers or {})
+        if meta:
+            if meta.get('etag'): request_headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'): request_headers['If-Modified-Since'] = meta['last_modified']
+        try:
+            status, response_headers, body = self.client.get(url, params=params, headers=request_headers, timeout=timeout, stats=stats)
+            if status == 304 and meta:
+                meta = self._meta_from(response_headers, None, now, meta)
+                atomic_write(self._paths(key)[1], json.dumps(meta).encode())
+                self._touch(key)
+                if stats: stats.cache = 'revalidated'
+                if breaker: breaker.record_success()
+                return CachedResponse(key, content, meta['digest'], 0.0, from_cache=True, not_modified=True), None
+            if status == 200:
+                meta = self._meta_from(response_headers, body, now)
+                self._store(key, body, meta)
+                if stats: stats.cache = 'miss'
+                if breaker: breaker.record_success()
+                return CachedResponse(key, body, meta['digest'], 0.0, from_cache=False), None
+            error = f"HTTP {status}"
+        except Exception as e:
+            error = str(e)
+        if breaker: breaker.record_failure()
+        return None, error
+
+    def parse(self, response, kind, parse_fn, stats=None, version=None):
+        # Memoiza el parseo por versión del cuerpo; misma versión -> mismo resultado sin re-parsear.
+        # version: emisión del producto (None = digest); cuerpos distintos de la misma emisión no se re-parsean.
+        # La clave del pedido entra al memo: la emisión (p. ej. la corrida de Met.no) es la misma para todas las
+        # coordenadas y cada ubicación tiene su propio resultado
+        memo_key = (kind, response.key, version or response.digest)
+        with self._lock:
+            if memo_key in self._memo:
+                self._memo.move_to_end(memo_key)
+                if stats: stats.parse_s = 0.0
+                return self._memo[memo_key]
+        start = time.perf_counter()
+        result = parse_fn(response.content)
+        if stats: stats.parse_s = time.perf_counter() - start
+        with self._lock:
+            self._memo[memo_key] = result
+            while len(self._memo) > self._memo_size: self._memo.popitem(last=False)
+        return result
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_cache():
+    global _shared
+    with _shared_lock:
+        if _shared is None: _shared = HTTPCache()
+        return _shared
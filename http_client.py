@@ -0,0 +1,105 @@
+import random
+import threading
+import time
+import httpx
+
+# Timeouts comunes a todos los proveedores (segundos)
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 15.0
+# Reintentos acotados con backoff exponencial + jitter completo
+RETRIES = 2
+BACKOFF = 0.5
+BACKOFF_MAX = 4.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+USER_AGENT = "WeatherAggregatorSMA/1.0 educational"
+
+def _http2_available():
+    try:
+        import h2
+        return True
+    except ImportError: return False
+
+class HTTPClient:
+    # Cliente único con pool de conexiones: keep-alive entre refrescos y HTTP/2 donde el host
+    # lo negocia (si h2 está instalado). Reintenta errores de red y 429/5xx con backoff.
+    def __init__(self, retries=RETRIES, backoff=BACKOFF, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 http2=None, transport=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.client = httpx.Client(
+            http2=_http2_available() if http2 is None else http2,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120),
+            headers={'User-Agent': USER_AGENT},
+            follow_redirects=True,
+            transport=transport,
+        )
+
+    def _delay(self, attempt, response=None):
+        # Retry-After del servidor si es razonable; si no, jitter completo sobre 2^intento
+        if response is not None:
+            try:
+                after = float(response.headers.get('Retry-After', ''))
+                if 0 <= after <= BACKOFF_MAX: return after
+            except ValueError: pass
+        return random.uniform(0, min(BACKOFF_MAX, self.backoff * 2 ** attempt))
+
+    def get(self, url, params=None, headers=None, timeout=None, stats=None):
+        # Devuelve (status, headers, body) con el cuerpo ya leído.
+        # timeout: presupuesto total en segundos para todos los intentos y esperas (None = los timeouts del
+        # cliente en cada intento); agotado, no se reintenta más
+        # stats (metrics.ProviderStats): hasta los encabezados (ttfb), cuerpo, handshake DNS+TCP+TLS (0 si la conexión estaba abierta) y reintentos
+        deadline = None if timeout is None else time.monotonic() + timeout
+        def can_wait(delay):
+            return deadline is None or time.monotonic() + delay < deadline
+        attempt = 0
+        # Eventos de httpcore (primera ocurrencia entre intentos): handshake de la conexión abierta
+        events = {}
+        def trace(name, info):
+            events.setdefault(name, time.perf_counter())
+        while True:
+            request_timeout = self.timeout
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0: raise httpx.TimeoutException(f"presupuesto de {url} agotado")
+                request_timeout = httpx.Timeout(min(left, self.timeout.read), connect=min(left, self.timeout.connect))
+            try:
+                start = time.perf_counter()
+                with self.client.stream("GET", url, params=params, headers=headers, timeout=request_timeout,
+                                        extensions={'trace': trace}) as r:
+                    headers_at = time.perf_counter()
+                    body = r.read()
+                    done = time.perf_counter()
+                if r.status_code in RETRY_STATUS and attempt < self.retries:
+                    delay = self._delay(attempt, r)
+                    if can_wait(delay):
+                        time.sleep(delay)
+                        attempt += 1
+                        continue
+                if stats:
+                    stats.ttfb_s = headers_at - start
+                    stats.transfer_s = done - headers_at
+                    stats.bytes += len(body)
+                    stats.retries = attempt
+                    tcp = events.get('connection.connect_tcp.started')
+                    tls = events.get('connection.start_tls.complete') or events.get('connection.connect_tcp.complete')
+                    stats.handshake_s = tls - tcp if tcp and tls else 0.0
+                return r.status_code, r.headers, body
+            except httpx.TransportError:
+                delay = self._delay(attempt)
+                if attempt >= self.retries or not can_wait(delay): raise
+                time.sleep(delay)
+                attempt += 1
+
+    def close(self):
+        self.client.close()
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_client():
+    global _shared
+    with _shared_lock:
+        if _shared is None: _shared = HTTPClient()
+        return _shared
@@ -0,0 +1,144 @@
+import collections
+import json
+import threading
+import time
+
+# Buckets (segundos) de los histogramas Prometheus
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0)
+
+class ProviderStats:
+    # Costo de un proveedor en un refresco
+    __slots__ = ('provider', 'ttfb_s', 'handshake_s', 'transfer_s', 'bytes', 'parse_s', 'total_s', 'cache', 'retries', 'issuance', 'error')
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.ttfb_s = None       # hasta recibir los encabezados (incluye conexión y tiempo del servidor)
+        self.handshake_s = None  # DNS + TCP + TLS de una conexión nueva (0 si se reusó del pool)
+        self.transfer_s = None   # lectura del cuerpo
+        self.bytes = 0
+        self.parse_s = None      # descompresión + parseo (0 si vino memoizado)
+        self.total_s = None      # tiempo de pared dentro del fetch concurrente
+        self.cache = None        # hit | miss | revalidated | stale
+        self.retries = 0
+        self.issuance = None     # emisión / corrida del producto descargado
+        self.error = None
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+class RefreshMetrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self.providers = {}
+        self.fetch_s = None
+        self.fusion_s = None
+        self.total_s = None
+
+    def to_dict(self):
+        return {
+            'started_at': self.started_at,
+            'fetch_s': self.fetch_s,
+            'fusion_s': self.fusion_s,
+            'total_s': self.total_s,
+            'providers': {name: stats.to_dict() for name, stats in self.providers.items()},
+        }
+
+def _percentile(values, q):
+    if not values: return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound: self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+class MetricsRegistry:
+    # Acumulado del proceso: últimos refrescos + histogramas/contadores para Prometheus
+    def __init__(self, history=500):
+        self._lock = threading.Lock()
+        self.history = collections.deque(maxlen=history)
+        self.refresh_hist = _Histogram()
+        self.fusion_hist = _Histogram()
+        self.stage_hist = collections.defaultdict(_Histogram)     # (proveedor, etapa)
+        self.bytes_total = collections.Counter()                  # proveedor
+        self.cache_total = collections.Counter()                  # (proveedor, resultado)
+        self.failures_total = collections.Counter()               # (proveedor, motivo)
+
+    def record(self, refresh):
+        with self._lock:
+            self.history.append(refresh.to_dict())
+            if refresh.total_s is not None: self.refresh_hist.observe(refresh.total_s)
+            if refresh.fusion_s is not None: self.fusion_hist.observe(refresh.fusion_s)
+            for name, stats in refresh.providers.items():
+                for stage in ('ttfb', 'handshake', 'transfer', 'parse', 'total'):
+                    value = getattr(stats, stage + '_s')
+                    if value is not None: self.stage_hist[(name, stage)].observe(value)
+                self.bytes_total[name] += stats.bytes
+                if stats.cache: self.cache_total[(name, stats.cache)] += 1
+                if stats.error: self.failures_total[(name, failure_reason(stats.error))] += 1
+
+    def summary(self):
+        with self._lock:
+            totals = [r['total_s'] for r in self.history if r['total_s'] is not None]
+            return {
+                'refreshes': len(self.history),
+                'refresh_p50_s': _percentile(totals, 0.5),
+                'refresh_p95_s': _percentile(totals, 0.95),
+                'last': self.history[-1] if self.history else None,
+            }
+
+    def to_json(self):
+        return json.dumps(self.summary(), indent=2, default=str)
+
+    def to_prometheus(self):
+        lines = []
+        def histogram(name, help_text, series):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, hist in series:
+                sep = "," if labels else ""
+                for bound, count in zip(BUCKETS, hist.counts):
+                    lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {hist.count}')
+                suffix = f"{{{labels}}}" if labels else ""
+                lines.append(f"{name}_sum{suffix} {hist.total:.6f}")
+                lines.append(f"{name}_count{suffix} {hist.count}")
+        with self._lock:
+            histogram("clima_sma_refresh_seconds", "Duración total de un refresco (fetch + fusión).", [("", self.refresh_hist)])
+            histogram("clima_sma_fusion_seconds", "Duración de la etapa de fusión.", [("", self.fusion_hist)])
+            histogram("clima_sma_provider_stage_seconds", "Duración por proveedor y etapa.",
+                      [(f'provider="{p}",stage="{s}"', h) for (p, s), h in sorted(self.stage_hist.items())])
+            lines.append("# HELP clima_sma_provider_bytes_total Bytes descargados por proveedor.")
+            lines.append("# TYPE clima_sma_provider_bytes_total counter")
+            for p, n in sorted(self.bytes_total.items()):
+                lines.append(f'clima_sma_provider_bytes_total{{provider="{p}"}} {n}')
+            lines.append("# HELP clima_sma_provider_cache_total Resultados de caché por proveedor.")
+            lines.append("# TYPE clima_sma_provider_cache_total counter")
+            for (p, r), n in sorted(self.cache_total.items()):
+                lines.append(f'clima_sma_provider_cache_total{{provider="{p}",result="{r}"}} {n}')
+            lines.append("# HELP clima_sma_provider_failures_total Fallas por proveedor y motivo.")
+            lines.append("# TYPE clima_sma_provider_failures_total counter")
+            for (p, r), n in sorted(self.failures_total.items()):
+                lines.append(f'clima_sma_provider_failures_total{{provider="{p}",reason="{r}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+def failure_reason(error):
+    # Motivo de baja cardinalidad para las etiquetas de Prometheus
+    text = str(error).lower()
+    if "deadline" in text: return "deadline"
+    if "circuit open" in text: return "circuit"
+    if "timeout" in text or "timed out" in text: return "timeout"
+    if text.startswith("http "): return "http"
+    if "resolve" in text or "connection" in text: return "connection"
+    if "parse" in text: return "parse"
+    return "error"
+
+REGISTRY = MetricsRegistry()
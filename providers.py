@@ -0,0 +1,151 @@
+import datetime
+import numpy as np
+from data_sources import SMNProvider, AICProvider, OpenMeteoProvider, OpenMeteoEnsembleProvider, OpenMeteoGridProvider, MetNoProvider, deg_to_cardinal
+from ensemble import ENSEMBLE, ensemble_records
+from records import ForecastBatch
+from spatial import GRID
+
+# Capacidades que puede declarar un proveedor:
+# variables fusionadas por día, variables de la grilla horaria y campos descriptivos del día
+FUSED = ('max_temp', 'min_temp', 'wind_speed')
+HOURLY = ('temp', 'wind_speed', 'gusts')
+DESCRIPTIVE = ('sky_text', 'wind_dir', 'pressure', 'gusts')
+# Hora 0 de Unix en el eje ordinal * 24 + hora de SMNStation.hours
+EPOCH_HOUR = datetime.date(1970, 1, 1).toordinal() * 24
+
+WMO_CODES = {
+    0: "Despejado", 1: "Mayormente Despejado", 2: "Parcialmente Nublado", 3: "Nublado",
+    45: "Niebla", 48: "Niebla", 51: "Llovizna", 53: "Llovizna", 55: "Llovizna",
+    61: "Lluvias", 63: "Lluvias", 65: "Lluvias Fuertes",
+    80: "Chubascos", 81: "Chubascos", 82: "Chubascos",
+    95: "Tormenta", 96: "Tormenta Granizo", 99: "Tormenta Granizo"
+}
+
+class ProviderSpec:
+    # Declaración de un proveedor para FusionEngine: qué aporta, cada cuánto, cuánto cuesta y cómo se cachea.
+    # fetch: nombre del método que descarga; adapt(proveedor, resultado) -> contribución:
+    # {'hourly': (horas ordinales, {variable: valores}) | None, 'daily': records.ForecastBatch | None,
+    #  'extras': {nombre: valor} (opcional)}
+    __slots__ = ('key', 'label', 'factory', 'fetch', 'adapt', 'variables', 'resolution_h', 'horizon_days',
+                 'cost', 'timeout', 'cache_ttl', 'base', 'priority', 'extras', 'enabled')
+
+    def __init__(self, key, label, factory, fetch, adapt, variables, resolution_h, horizon_days,
+                 cost=1.0, timeout=10.0, cache_ttl=None, base=False, priority=10, extras=(), enabled=True):
+        self.key = key                      # clave en métricas, archivo histórico, skill y debug
+        self.label = label                  # nombre visible en "Fusion (...)"
+        self.factory = factory
+        self.fetch = fetch
+        self.adapt = adapt
+        self.variables = frozenset(variables)
+        self.resolution_h = resolution_h    # resolución nativa en horas (12 = día/noche); hasta MAX_GAP_H va a la grilla horaria
+        self.horizon_days = horizon_days    # días desde hoy que publica: los siguientes no entran a la fusión
+        self.cost = cost                    # costo relativo (descarga + parseo): los caros se lanzan primero
+        self.timeout = timeout              # segundos; el deadline global de la fusión sigue mandando
+        self.cache_ttl = cache_ttl          # None = el TTL propio del proveedor
+        self.base = base                    # base del peso fijo (Open-Meteo, 40%)
+        self.priority = priority            # menor = preferido para los campos descriptivos
+        # Lo que el adaptador publica aparte de la fusión: un ForecastBatch acompaña a cada día del resumen
+        # (p. ej. 'ensemble'); cualquier otro valor queda en FusionEngine.extras (p. ej. el cubo 'grid')
+        self.extras = tuple(extras)
+        self.enabled = enabled              # False = opt-in, solo con FusionEngine(extras=...)
+
+    def build(self, cache=None):
+        provider = self.factory(cache=cache)
+        if self.cache_ttl is not None: provider.cache_ttl = self.cache_ttl
+        return provider
+
+    def supplies(self, variables):
+        return not self.variables.isdisjoint(variables)
+
+PROVIDERS = {}
+
+def register_provider(spec):
+    # El orden de registro es el orden de las fuentes en los bloques de la fusión
+    PROVIDERS[spec.key] = spec
+    return spec
+
+def open_meteo_hourly(data):
+    # Bloque "hourly" de Open-Meteo (hora local) -> (horas ordinales, {variable: valores})
+    hourly = (data or {}).get('hourly')
+    if not hourly: return None
+    try:
+        hours = np.array(hourly['time'], dtype='datetime64[h]').astype(np.int64) + EPOCH_HOUR
+        columns = {
+            'temp': np.array(hourly['temperature_2m'], dtype=float),
+            'wind_speed': np.array(hourly['wind_speed_10m'], dtype=float),
+            'gusts': np.array(hourly['wind_gusts_10m'], dtype=float),
+        }
+    except (KeyError, ValueError, TypeError): return None
+    return hours, columns
+
+def open_meteo_records(data):
+    # Bloque "daily" de Open-Meteo -> ForecastBatch con los campos descriptivos (columnas vectorizadas)
+    daily = (data or {}).get('daily')
+    if not daily: return None
+    try:
+        column = lambda name: np.array(daily[name], dtype=float)
+        codes, degs = column('weather_code'), column('wind_direction_10m_dominant')
+        return ForecastBatch(np.array(daily['time'], dtype='datetime64[D]').astype(np.int64) + EPOCH_HOUR // 24, {
+            'max_temp': np.round(column('temperature_2m_max')),
+            'min_temp': np.round(column('temperature_2m_min')),
+            'wind_speed': np.round(column('wind_speed_10m_max')),
+            'gusts': np.round(column('wind_gusts_10m_max')),
+            'code': codes,
+            'sky_text': [WMO_CODES.get(int(code), "Variable") if code == code else None for code in codes.tolist()],
+            'wind_dir_deg': degs,
+            'wind_dir': [deg_to_cardinal(deg) if deg == deg else None for deg in degs.tolist()],
+        }, 'Open-Meteo')
+    except (KeyError, ValueError, TypeError): return None
+
+def _adapt_open_meteo(provider, data):
+    if not data: return None
+    hourly, daily = open_meteo_hourly(data), open_meteo_records(data)
+    if hourly is None and not daily: return None
+    return {'hourly': hourly, 'daily': daily}
+
+def _adapt_smn(provider, station):
+    if not station or not len(station): return None
+    return {'hourly': (station.hours, {'temp': station.temp, 'wind_speed': station.wind_speed}),
+            'daily': provider._to_forecasts(station)}
+
+def _adapt_aic(provider, records):
+    return {'hourly': None, 'daily': records} if records else None
+
+def _adapt_metno(provider, series):
+    if not series or not len(series['hours']): return None
+    return {'hourly': (series['hours'], series), 'daily': None}
+
+def _adapt_ensemble(provider, decoded):
+    if not decoded: return None
+    times, matrices = decoded
+    hours = times.astype(np.int64) + EPOCH_HOUR
+    records = ensemble_records(hours, matrices)
+    return {'hourly': None, 'daily': None, 'extras': {'ensemble': records}} if records else None
+
+def _adapt_grid(provider, grid):
+    return {'hourly': None, 'daily': None, 'extras': {'grid': grid}} if grid is not None and len(grid) else None
+
+register_provider(ProviderSpec(
+    'om', 'OM', OpenMeteoProvider, 'get_data', _adapt_open_meteo,
+    variables=FUSED + HOURLY + ('sky_text', 'wind_dir'), resolution_h=1, horizon_days=16,
+    cost=1.0, timeout=8.0, cache_ttl=900, base=True, priority=1))
+register_provider(ProviderSpec(
+    'aic', 'AIC', AICProvider, 'get_forecast', _adapt_aic,
+    variables=FUSED + ('sky_text', 'wind_dir', 'pressure'), resolution_h=12, horizon_days=5,
+    cost=3.0, timeout=12.0, cache_ttl=3600, priority=0))
+register_provider(ProviderSpec(
+    'smn', 'SMN', SMNProvider, 'get_station', _adapt_smn,
+    variables=FUSED + ('temp', 'wind_dir', 'precip'), resolution_h=3, horizon_days=5,
+    cost=2.0, timeout=12.0, cache_ttl=1800, priority=2))
+register_provider(ProviderSpec(
+    'metno', 'Met.no', MetNoProvider, 'get_hourly', _adapt_metno,
+    variables=FUSED + ('temp',), resolution_h=1, horizon_days=9,
+    cost=1.0, timeout=8.0, cache_ttl=1800, priority=3))
+register_provider(ProviderSpec(
+    'ens', 'Ensamble', OpenMeteoEnsembleProvider, 'get_members', _adapt_ensemble,
+    variables=(), resolution_h=1, horizon_days=7,
+    cost=2.0, timeout=10.0, cache_ttl=3600, priority=9, extras=('ensemble',), enabled=ENSEMBLE))
+register_provider(ProviderSpec(
+    'grid', 'Grilla', OpenMeteoGridProvider, 'get_grid', _adapt_grid,
+    variables=(), resolution_h=1, horizon_days=7,
+    cost=2.0, timeout=10.0, cache_ttl=3600, priority=9, extras=('grid',), enabled=GRID))
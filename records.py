@@ -0,0 +1,169 @@
+import datetime
+import numpy as np
+
+# Esquema común de los registros diarios de todos los proveedores:
+# texto en listas, el resto numérico (NaN = sin dato). 'pressure' siempre en hPa numérico
+TEXT = frozenset(('sky_text', 'wind_dir'))
+# Campos que se publican como enteros (ya vienen redondeados por cada proveedor)
+INTEGER = frozenset(('max_temp', 'min_temp', 'wind_speed', 'gusts', 'pressure', 'code', 'members'))
+
+class ForecastRecord:
+    # Vista de una fila de ForecastBatch: no copia valores, se lee como un dict de solo lectura
+    __slots__ = ('batch', 'row')
+
+    def __init__(self, batch, row):
+        self.batch = batch
+        self.row = row
+
+    def __getattr__(self, name):
+        if name.startswith('_'): raise AttributeError(name)
+        try: return self.batch.value(name, self.row)
+        except KeyError: raise AttributeError(name) from None
+
+    def __getitem__(self, name):
+        return self.batch.value(name, self.row)
+
+    def get(self, name, default=None):
+        try: return self.batch.value(name, self.row)
+        except KeyError: return default
+
+    def keys(self):
+        return ['date', *self.batch.fields(), 'source']
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __contains__(self, name):
+        return name in ('date', 'source') or name in self.batch.fields()
+
+    def to_dict(self):
+        return {name: self[name] for name in self.keys()}
+
+    def __reduce__(self):
+        # pickle: la fila y una referencia al lote (compartido entre todas sus vistas)
+        return ForecastRecord, (self.batch, self.row)
+
+    def __repr__(self):
+        return f"ForecastRecord({self.to_dict()!r})"
+
+class ForecastBatch:
+    # Registros diarios de una fuente en columnas: fechas ordinales (int32), una matriz float64 filas x campos
+    # numéricos y listas para el texto. Iterar o indexar devuelve ForecastRecord (vistas); pickle guarda
+    # dos arrays por lote, no un dict por día
+    __slots__ = ('ordinals', 'names', 'values', 'text', 'source', '_position', '_index')
+
+    def __init__(self, ordinals, columns, source):
+        self.ordinals = np.asarray(ordinals, dtype=np.int32)
+        numeric = {name: column for name, column in columns.items() if not isinstance(column, list)}
+        self.names = tuple(numeric)
+        self.values = np.empty((len(self.ordinals), len(numeric)))
+        for j, column in enumerate(numeric.values()): self.values[:, j] = column
+        self.text = {name: column for name, column in columns.items() if isinstance(column, list)}
+        self.source = source
+        for name, column in self.text.items():
+            if len(column) != len(self.ordinals): raise ValueError(f"columna {name}: {len(column)} filas, {len(self.ordinals)} fechas")
+        self._reset()
+
+    def _reset(self):
+        self._position = {name: j for j, name in enumerate(self.names)}
+        self._index = None
+
+    @classmethod
+    def from_records(cls, records, source=None):
+        # Lista de dicts (formato anterior, JSON persistido, proveedores externos) -> lote
+        rows = [r for r in records or [] if r.get('date')]
+        names = []
+        for r in rows:
+            names.extend(name for name in r if name not in ('date', 'source') and name not in names)
+        columns = {}
+        for name in names:
+            values = [r.get(name) for r in rows]
+            if name in TEXT or any(isinstance(v, str) for v in values): columns[name] = values
+            else: columns[name] = np.array(values, dtype=float)
+        if source is None: source = rows[0].get('source') if rows else None
+        return cls([r['date'].toordinal() for r in rows], columns, source)
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def __getitem__(self, row):
+        if not -len(self) <= row < len(self): raise IndexError(row)
+        return ForecastRecord(self, row % len(self))
+
+    def __iter__(self):
+        return (ForecastRecord(self, row) for row in range(len(self)))
+
+    def __getstate__(self):
+        # Buffers crudos: sin el reduce de NumPy por array (que domina en lotes de pocos días)
+        return self.ordinals.tobytes(), self.names, self.values.tobytes(), self.text, self.source
+
+    def __setstate__(self, state):
+        ordinals, self.names, values, self.text, self.source = state
+        self.ordinals = np.frombuffer(ordinals, dtype=np.int32)
+        self.values = np.frombuffer(values).reshape(len(self.ordinals), len(self.names))
+        self._reset()
+
+    def fields(self):
+        return [*self.names, *self.text]
+
+    def value(self, name, row):
+        if name == 'date': return datetime.date.fromordinal(int(self.ordinals[row]))
+        if name == 'source': return self.source
+        j = self._position.get(name)
+        if j is None: return self.text[name][row]
+        v = self.values[row, j]
+        if v != v: return None
+        return int(v) if name in INTEGER else float(v)
+
+    def column(self, name):
+        # Columna numérica (vista sobre la matriz; NaN si la fuente no la informa)
+        j = self._position.get(name)
+        return self.values[:, j] if j is not None else np.full(len(self), np.nan)
+
+    def columns(self):
+        return {**{name: self.values[:, j] for j, name in enumerate(self.names)}, **self.text}
+
+    def dates(self):
+        return [datetime.date.fromordinal(o) for o in self.ordinals.tolist()]
+
+    def row_of(self, ordinal):
+        # Fila de una fecha ordinal (-1 si no está); con fechas repetidas gana la primera
+        if self._index is None:
+            self._index = {}
+            for row, o in enumerate(self.ordinals.tolist()): self._index.setdefault(o, row)
+        return self._index.get(int(ordinal), -1)
+
+    def at(self, date):
+        row = self.row_of(date.toordinal())
+        return ForecastRecord(self, row) if row >= 0 else None
+
+    def align(self, ordinals):
+        # Mismo lote sobre otras fechas: las que no informa quedan sin dato
+        ordinals = np.asarray(ordinals, dtype=np.int32)
+        rows = np.array([self.row_of(o) for o in ordinals.tolist()], dtype=np.intp)
+        ok = rows >= 0
+        aligned = ForecastBatch(ordinals, {name: [column[r] if r >= 0 else None for r in rows.tolist()]
+                                           for name, column in self.text.items()}, self.source)
+        aligned.names, aligned.values = self.names, np.full((len(ordinals), len(self.names)), np.nan)
+        aligned.values[ok] = self.values[rows[ok]]
+        aligned._reset()
+        return aligned
+
+    def with_columns(self, **columns):
+        # Lote con las mismas fechas y algunas columnas reemplazadas o agregadas
+        return ForecastBatch(self.ordinals, dict(self.columns(), **columns), self.source)
+
+    def to_dicts(self):
+        return [record.to_dict() for record in self]
+
+def as_batch(records):
+    # Contribución diaria de un proveedor (lote, lista de dicts o None) -> ForecastBatch o None
+    if records is None or isinstance(records, ForecastBatch): return records
+    return ForecastBatch.from_records(records)
+
+def json_default(value):
+    # default de json.dumps para snapshots, API y archivo: registros como dict, fechas ISO, escalares NumPy
+    if isinstance(value, ForecastRecord): return value.to_dict()
+    if isinstance(value, (datetime.date, datetime.datetime)): return value.isoformat()
+    if isinstance(value, np.generic): return value.item()
+    return str(value)
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from archive import ForecastArchive, DEFAULT_LOCATION
+from http_cache import CACHE_DIR, FileLock, atomic_write
+from records import json_default
+from skill import SkillTracker
+
+SNAPSHOT_FILE = os.path.join(CACHE_DIR, "snapshot.pkl")
+
+class Snapshot:
+    def __init__(self, data, created_at, snapshot_id=None, metrics=None, hourly=None, inputs=None, grid=None):
+        self.data = data
+        self.created_at = created_at
+        self.metrics = metrics    # metrics.RefreshMetrics.to_dict() del refresco que lo produjo
+        self.hourly = hourly      # FusionEngine.hourly: grilla horaria (arrays NumPy) para los gráficos
+        self.inputs = inputs      # FusionEngine.inputs: emisión de cada producto que entró a la fusión
+        self.grid = grid          # spatial.SpatialGrid del modo grilla (None si está apagado)
+        # Id por contenido: mismo pronóstico -> mismo id (sirve de ETag y de clave de memo)
+        # (JSON canónico: pickle varía con referencias compartidas aunque los valores sean iguales)
+        if snapshot_id is None:
+            digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=json_default).encode())
+            if hourly is not None: digest.update(hourly['values'].tobytes())
+            if grid is not None: digest.update(grid.cube.tobytes())
+            snapshot_id = digest.hexdigest()[:16]
+        self.snapshot_id = snapshot_id
+
+    @property
+    def age(self):
+        return time.time() - self.created_at
+
+def load_snapshot(path=SNAPSHOT_FILE):
+    try:
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        return Snapshot(state['data'], state['created_at'], state['snapshot_id'], state.get('metrics'), state.get('hourly'),
+                        state.get('inputs'), state.get('grid'))
+    except Exception: return None
+
+class ForecastRefresher:
+    # Stale-while-revalidate: un hilo daemon recalcula la fusión antes de que venza
+    # y las páginas siempre leen el último snapshot bueno sin bloquear.
+    # Single-flight entre procesos (réplicas, API + Streamlit): un lock sobre el snapshot hace que
+    # uno solo descargue y fusione; los demás esperan y adoptan el snapshot que dejó en disco.
+    def __init__(self, interval=3600, refresh_ahead=0.8, retry=120, snapshot_file=SNAPSHOT_FILE, engine_factory=None, archive=None,
+                 skill=None, observer=None, lock_timeout=60):
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.retry = retry
+        self.snapshot_file = snapshot_file
+        self.lock = FileLock(snapshot_file + ".lock")
+        self.lock_timeout = lock_timeout
+        # None = FusionEngine, importado recién en el primer refresco (pandas, pdfplumber, httpx).
+        # Se llama con skill=self.skill: el motor pondera con el mismo tracker que actualiza verify_pending
+        self.engine_factory = engine_factory
+        # Cada refresco exitoso se agrega al archivo histórico (False lo desactiva)
+        self.archive = ForecastArchive() if archive is None else archive
+        # Verificación contra observaciones: actualiza el skill por fuente que usa la fusión
+        self.skill = SkillTracker() if skill is None else skill
+        self.observer = observer
+        # Un solo motor por refresher: recuerda la última fusión y no la repite si no cambió ningún insumo
+        self._engine = None
+        self.refreshing = False
+        self.last_error = None
+        self._snapshot = self._load()
+        self._ready = threading.Event()
+        if self._snapshot: self._ready.set()
+        self._wake = threading.Event()
+        self._force = False
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _load(self):
+        return load_snapshot(self.snapshot_file)
+
+    def _save(self, snapshot):
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_file) or ".", exist_ok=True)
+            state = {'data': snapshot.data, 'created_at': snapshot.created_at,
+                     'snapshot_id': snapshot.snapshot_id, 'metrics': snapshot.metrics, 'hourly': snapshot.hourly,
+                     'inputs': snapshot.inputs, 'grid': snapshot.grid}
+            atomic_write(self.snapshot_file, pickle.dumps(state))
+        except OSError as e: print(f"Snapshot Save Error: {e}")
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="forecast-refresher", daemon=True)
+                self._thread.start()
+        return self
+
+    def _next_due(self):
+        if self._snapshot is None: return 0
+        return self._snapshot.created_at + self.interval * self.refresh_ahead - time.time()
+
+    def _loop(self):
+        while True:
+            delay = self._next_due()
+            # Un pedido pendiente (request_refresh) no espera al vencimiento del snapshot
+            if delay > 0 and not self._force: self._wake.wait(timeout=delay)
+            self._wake.clear()
+            force, self._force = self._force, False
+            if not self.refresh_now(force=force):
+                # Falló: reintento con espera fija, el snapshot anterior se sigue sirviendo
+                if not self._force: self._wake.wait(timeout=self.retry)
+                self._wake.clear()
+
+    def _adopt(self, started, force):
+        # Snapshot que otro proceso escribió: vale si terminó mientras esperábamos el lock,
+        # o (sin pedido explícito) si es más nuevo que el nuestro y todavía no le toca refrescar
+        disk = self._load()
+        if disk is None: return False
+        if disk.created_at < started:
+            if force or disk.age >= self.interval * self.refresh_ahead: return False
+            if self._snapshot and disk.created_at <= self._snapshot.created_at: return False
+        self._snapshot = disk
+        remember = getattr(self._engine, 'remember', None)
+        if remember: remember(disk.inputs, disk.data, disk.hourly)
+        self._ready.set()
+        return True
+
+    def refresh_now(self, force=True):
+        # force: refrescar aunque otro proceso tenga un snapshot reciente (pedido del usuario / CLI)
+        self.refreshing = True
+        started = time.time()
+        if not self.lock.acquire(timeout=self.lock_timeout):
+            self.last_error = "otro proceso está refrescando"
+            self.refreshing = False
+            return False
+        try:
+            if self._adopt(started, force):
+                self.last_error = None
+                return True
+            if self.engine_factory is None:
+                from fusion_engine import FusionEngine
+                self.engine_factory = FusionEngine
+            if self._engine is None:
+                self._engine = self.engine_factory(skill=self.skill)
+                remember = getattr(self._engine, 'remember', None)
+                if remember and self._snapshot: remember(self._snapshot.inputs, self._snapshot.data, self._snapshot.hourly)
+            engine = self._engine
+            data = engine.get_5_day_forecast()
+            if not data or all(day['max_temp'] is None for day in data):
+                self.last_error = "Sin datos de ninguna fuente"
+                return False
+            metrics = getattr(engine, 'metrics', None)
+            snapshot = Snapshot(data, time.time(), metrics=metrics.to_dict() if metrics else None,
+                                hourly=getattr(engine, 'hourly', None), inputs=getattr(engine, 'inputs', None),
+                                grid=(getattr(engine, 'extras', None) or {}).get('grid'))
+            self._snapshot = snapshot
+            self._save(snapshot)
+            # Mismas emisiones que el refresco anterior: no hay pronóstico nuevo que archivar
+            if self.archive and not getattr(engine, 'reused', False):
+                try: self.archive.append(data, issue_time=snapshot.created_at)
+                except Exception as e: print(f"Archive Error: {e}")
+            if self.archive and self.skill:
+                if self.observer is None:
+                    from data_sources import ObservedProvider
+                    self.observer = ObservedProvider()
+                try: self.skill.verify_pending(self.archive, self.observer, DEFAULT_LOCATION)
+                except Exception as e: print(f"Skill Error: {e}")
+            self.last_error = None
+            self._ready.set()
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Refresh Error: {e}")
+            return False
+        finally:
+            self.lock.release()
+            self.refreshing = False
+
+    def request_refresh(self):
+        # No bloqueante: despierta al hilo y vuelve enseguida
+        self._force = True
+        self.start()
+        self._wake.set()
+
+    def get(self, wait=None):
+        # Último snapshot bueno; solo el arranque en frío (sin snapshot en disco) espera
+        if self._snapshot is None and wait:
+            self._ready.wait(timeout=wait)
+        return self._snapshot
@@ -0,0 +1,101 @@
+import datetime
+import json
+import os
+import threading
+import numpy as np
+from http_cache import atomic_write
+
+SKILL_FILE = os.environ.get("CLIMA_SMA_SKILL", "skill_state.json")
+SKILL_VARIABLES = ('max_temp', 'min_temp', 'wind_speed')
+# Error típico supuesto sin historia (misma unidad que la variable); con n=0 los pesos quedan en el split fijo
+PRIOR_MAE = {'max_temp': 2.5, 'min_temp': 2.5, 'wind_speed': 8.0}
+
+class SkillTracker:
+    # Error por (fuente, variable, lead en días): n, sesgo (media de pronóstico - observado) y MAE.
+    # Cada observación actualiza en O(1) con media acumulada que pasa a exponencial tras `window`
+    # muestras, así el estado es chico y sigue cambios de calidad de los modelos.
+    def __init__(self, path=SKILL_FILE, window=60, prior_count=10, verify_lag=6):
+        self.path = path
+        self.window = window
+        self.prior_count = prior_count    # muestras "virtuales" del prior (encogimiento hacia el split fijo)
+        self.verify_lag = verify_lag      # días de demora de las observaciones (ERA5)
+        self._lock = threading.Lock()
+        self.stats = {}                   # "fuente|variable|lead" -> [n, bias, mae]
+        self.verified_through = {}        # ubicación -> última fecha verificada (ISO)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f: state = json.load(f)
+            self.stats = state.get('stats', {})
+            self.verified_through = state.get('verified_through', {})
+        except (OSError, ValueError): pass
+
+    def save(self):
+        with self._lock:
+            state = {'stats': self.stats, 'verified_through': self.verified_through}
+        try: atomic_write(self.path, json.dumps(state).encode())
+        except OSError as e: print(f"Skill Save Error: {e}")
+
+    def update(self, provider, variable, lead, forecast, observed):
+        if forecast is None or observed is None: return
+        error = float(forecast) - float(observed)
+        key = f"{provider}|{variable}|{int(lead)}"
+        with self._lock:
+            n, bias, mae = self.stats.get(key, (0, 0.0, 0.0))
+            n += 1
+            alpha = max(1.0 / n, 1.0 / self.window)
+            bias += alpha * (error - bias)
+            mae += alpha * (abs(error) - mae)
+            self.stats[key] = [n, bias, mae]
+
+    def get(self, provider, variable, lead):
+        n, bias, mae = self.stats.get(f"{provider}|{variable}|{int(lead)}", (0, 0.0, 0.0))
+        return {'n': n, 'bias': bias, 'mae': mae}
+
+    def adjustments(self, providers, leads, variables=SKILL_VARIABLES):
+        # Factores de peso y sesgos (fuentes x leads x variables) para la fusión vectorizada.
+        # factor = (MAE_prior / MAE_efectivo)^2, con el MAE encogido hacia el prior según n.
+        factor = np.ones((len(providers), len(leads), len(variables)))
+        bias = np.zeros_like(factor)
+        k = self.prior_count
+        for p, provider in enumerate(providers):
+            for d, lead in enumerate(leads):
+                for v, variable in enumerate(variables):
+                    n, b, mae = self.stats.get(f"{provider}|{variable}|{int(lead)}", (0, 0.0, 0.0))
+                    if not n: continue
+                    prior = PRIOR_MAE.get(variable, 1.0)
+                    effective = (n * mae + k * prior) / (n + k)
+                    factor[p, d, v] = (prior / max(effective, 1e-3)) ** 2
+                    bias[p, d, v] = n * b / (n + k)
+        return factor, bias
+
+    def verify_pending(self, archive, observer, location, today=None):
+        # Procesa cada día observado una sola vez: para cada fuente y fecha de emisión toma el
+        # último pronóstico emitido ese día y actualiza sus estadísticas (sin recorrer la historia).
+        today = today or datetime.date.today()
+        end = today - datetime.timedelta(days=self.verify_lag)
+        last = self.verified_through.get(location)
+        start = datetime.date.fromisoformat(last) + datetime.timedelta(days=1) if last else end - datetime.timedelta(days=30)
+        if start > end: return 0
+        observed = observer.get_observed(start, end)
+        if not observed: return 0
+        updates = 0
+        day = start
+        while day <= end:
+            obs = observed.get(day)
+            if obs:
+                latest = {}
+                for row in archive.forecasts_for(day, location=location):
+                    issue_date = datetime.datetime.fromtimestamp(row['issue_time']).date()
+                    latest[(row['provider'], issue_date)] = row   # filas ordenadas por issue_time: gana la última
+                for (provider, issue_date), row in latest.items():
+                    lead = (day - issue_date).days
+                    if lead < 0: continue
+                    for variable in SKILL_VARIABLES:
+                        self.update(provider, variable, lead, row.get(variable), obs.get(variable))
+                        updates += 1
+                with self._lock: self.verified_through[location] = day.isoformat()
+            day += datetime.timedelta(days=1)
+        self.save()
+        return updates
@@ -0,0 +1,96 @@
+import os
+import numpy as np
+
+# Modo grilla: un solo pedido de Open-Meteo para todos los puntos de la cuenca (apagado por defecto)
+GRID = os.environ.get("CLIMA_SMA_GRID", "0") == "1"
+# Puntos de la cuenca del Lanín (lat, lon aproximadas); la elevación la informa Open-Meteo (DEM 90 m)
+BASIN_POINTS = {
+    'san_martin': (-40.157, -71.353),
+    'lago_lacar': (-40.180, -71.480),
+    'hua_hum': (-40.120, -71.640),
+    'lago_lolog': (-40.030, -71.350),
+    'chapelco_base': (-40.255, -71.205),
+    'chapelco_cumbre': (-40.280, -71.245),
+    'aeropuerto_chapelco': (-40.075, -71.137),
+    'junin_de_los_andes': (-39.950, -71.070),
+    'lago_tromen': (-39.570, -71.450),
+}
+# Variable del cubo -> variable horaria de Open-Meteo
+GRID_VARIABLES = {'temp': 'temperature_2m', 'wind_speed': 'wind_speed_10m', 'gusts': 'wind_gusts_10m'}
+# Gradiente térmico estándar (°C por metro) y peso del desnivel: 1 m vertical "aleja" como 100 m horizontales
+LAPSE_RATE = 0.0065
+VERTICAL_SCALE = 100.0
+IDW_POWER = 2
+EARTH_RADIUS_M = 6371000.0
+
+class SpatialGrid:
+    # Pronóstico horario de N puntos en un cubo compacto (puntos x horas x variables, float32)
+    __slots__ = ('names', 'lat', 'lon', 'elevation', 'time', 'variables', 'cube')
+
+    def __init__(self, names, lat, lon, elevation, time, variables, cube):
+        self.names = list(names)
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.elevation = np.asarray(elevation, dtype=float)
+        self.time = time                  # datetime64[h], hora local
+        self.variables = list(variables)
+        self.cube = cube
+
+    def __len__(self):
+        return len(self.names)
+
+    def interpolate(self, lat, lon, elevation=None, power=IDW_POWER):
+        # Q puntos arbitrarios -> (Q, horas, variables) en una sola operación vectorizada.
+        # IDW sobre una distancia que suma el desnivel (VERTICAL_SCALE), y la temperatura de cada punto
+        # de la grilla se lleva a la altura destino con LAPSE_RATE antes de ponderar.
+        lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        lon = np.atleast_1d(np.asarray(lon, dtype=float))
+        mid = np.radians((lat[:, None] + self.lat[None, :]) / 2)
+        dlat = np.radians(lat[:, None] - self.lat[None, :])
+        dlon = np.radians(lon[:, None] - self.lon[None, :]) * np.cos(mid)
+        horizontal = EARTH_RADIUS_M * np.hypot(dlat, dlon)
+        if elevation is None:
+            # Sin altura del punto: la de la grilla interpolada en el plano
+            w = 1.0 / np.maximum(horizontal, 1.0) ** power
+            elevation = (w * self.elevation).sum(axis=1) / w.sum(axis=1)
+        elevation = np.broadcast_to(np.asarray(elevation, dtype=float), lat.shape)
+        dz = elevation[:, None] - self.elevation[None, :]
+        weights = 1.0 / np.maximum(np.hypot(horizontal, VERTICAL_SCALE * dz), 1.0) ** power
+        valid = ~np.isnan(self.cube)
+        norm = np.einsum('qp,phv->qhv', weights, valid)
+        values = np.einsum('qp,phv->qhv', weights, np.nan_to_num(self.cube))
+        if 'temp' in self.variables:
+            t = self.variables.index('temp')
+            values[..., t] -= LAPSE_RATE * np.einsum('qp,ph->qh', weights * dz, valid[..., t])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return values / norm
+
+    def daily(self, values):
+        # (Q, horas, variables) -> (fechas, {variable: (Q, días)}): máx/mín de temperatura, viento y ráfaga máximas
+        days = self.time.astype('datetime64[D]')
+        dates, starts = np.unique(days, return_index=True)
+        out = {}
+        for v, var in enumerate(self.variables):
+            series = values[..., v]
+            if var == 'temp':
+                out['max_temp'] = np.fmax.reduceat(series, starts, axis=1)
+                out['min_temp'] = np.fmin.reduceat(series, starts, axis=1)
+            else:
+                out[var] = np.fmax.reduceat(series, starts, axis=1)
+        return dates, out
+
+def grid_from_response(data, points, variables=GRID_VARIABLES):
+    # Respuesta multi-ubicación de Open-Meteo (lista, una entrada por coordenada pedida, en orden) -> SpatialGrid.
+    # Las coordenadas son las pedidas; Open-Meteo devuelve la celda del modelo y la elevación del DEM
+    if isinstance(data, dict): data = [data]
+    if not data or len(data) != len(points): return None
+    time = np.array(data[0]['hourly']['time'], dtype='datetime64[h]')
+    cube = np.full((len(data), len(time), len(variables)), np.nan, dtype=np.float32)
+    for p, location in enumerate(data):
+        hourly = location['hourly']
+        for v, name in enumerate(variables.values()):
+            series = hourly.pop(name, None)
+            if series is not None: cube[p, :len(series), v] = np.array(series[:len(time)], dtype=float)
+    lat, lon = zip(*points.values())
+    elevation = [location.get('elevation') or 0.0 for location in data]
+    return SpatialGrid(points, lat, lon, elevation, time, variables, cube)
@@ -0,0 +1,51 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from fusion_engine import FusionEngine
+from providers import FUSED, ProviderSpec
+from records import ForecastBatch
+
+TODAY = datetime.date(2026, 10, 17)
+
+class FakeProvider:
+    # Registros diarios fijos, sin red; cuenta las descargas
+    def __init__(self):
+        self.calls = 0
+
+    def get(self):
+        self.calls += 1
+        return ForecastBatch([TODAY.toordinal(), TODAY.toordinal() + 1],
+                             {'max_temp': np.array([18.0, 17.0]), 'min_temp': np.array([3.0, 2.0]),
+                              'wind_speed': np.array([30.0, 25.0]), 'sky_text': ["Nublado", "Lluvias"],
+                              'wind_dir': ["NO", "O"], 'pressure': np.array([1012.0, 1010.0])}, 'Fake')
+
+def _engine(horizon_days=5):
+    provider = FakeProvider()
+    spec = ProviderSpec('fake', 'Fake', lambda cache=None: provider, 'get',
+                        lambda provider, records: {'hourly': None, 'daily': records},
+                        variables=FUSED + ('sky_text', 'wind_dir', 'pressure'), resolution_h=12, horizon_days=horizon_days)
+    return FusionEngine(skill=False, providers=[spec]), provider
+
+def test_variables_take_summary_names():
+    engine, provider = _engine()
+    day, = engine.get_forecast(days=1, today=TODAY, variables=['sky_desc'])
+    assert provider.calls == 1
+    assert day['sky_desc'] == "Nublado"
+    assert day['source'] == "Fusion (Fake)"
+    # Solo se completa lo pedido
+    assert day['max_temp'] is None and day['pressure'] == "-"
+
+def test_unknown_variables_raise():
+    engine, provider = _engine()
+    with pytest.raises(ValueError, match="sky_text"):
+        engine.get_forecast(days=1, today=TODAY, variables=['max_temp', 'sky_text'])
+    assert provider.calls == 0
+
+def test_days_past_the_horizon_are_masked():
+    engine, provider = _engine(horizon_days=1)
+    first, second = engine.get_forecast(days=2, today=TODAY)
+    assert first['max_temp'] == 18 and first['sky_desc'] == "Nublado"
+    assert second['max_temp'] is None and second['sky_desc'] == "Desconocido"
+    assert second['source'] == "Fusion ()"
@@ -0,0 +1,43 @@
+import threading
+import time
+
+from refresher import ForecastRefresher, Snapshot
+
+DAY = {'max_temp': 18, 'min_temp': 3}
+
+class FlakyEngine:
+    # Falla el primer refresco y anota cada llamada
+    def __init__(self):
+        self.calls = 0
+        self.called = threading.Event()
+
+    def get_5_day_forecast(self):
+        self.calls += 1
+        self.called.set()
+        if self.calls == 1: raise RuntimeError("upstream caído")
+        return [DAY]
+
+def test_forced_refresh_after_failure_runs_right_away(tmp_path):
+    engine = FlakyEngine()
+    refresher = ForecastRefresher(interval=3600, retry=600, snapshot_file=str(tmp_path / "snapshot.pkl"),
+                                  engine_factory=lambda skill=None: engine, archive=False, skill=False)
+    # Snapshot recién hecho: el próximo refresco programado recién vence en ~48 min
+    refresher._snapshot = Snapshot([DAY], time.time())
+
+    refresher.request_refresh()
+    assert engine.called.wait(5)
+    engine.called.clear()
+    deadline = time.time() + 5
+    while refresher.refreshing or refresher.last_error is None:
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+    # Pedido durante la espera de reintento: no queda para el vencimiento del snapshot
+    refresher.request_refresh()
+    assert engine.called.wait(5)
+    deadline = time.time() + 5
+    while refresher.last_error is not None:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert engine.calls == 2
+    assert refresher.get().data == [DAY]